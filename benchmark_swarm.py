@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the swarm.
+
+Drives the Orchestrator over a copy of the dataset with the mock model, whose
+latency, jitter, 429 rate and response size are configurable, and reports
+files/sec, per-file latency (p50/p95) and the time spent in each stage. Every
+result is appended to benchmarks/results.jsonl with the current commit, so a
+run can be compared with an earlier one:
+
+    python generate_dataset.py
+    python benchmark_swarm.py --latency 0.2 --jitter 0.05 --runs 3
+    python benchmark_swarm.py --latency 0.2 --jitter 0.05 --runs 3 --compare
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(REPO_DIR, "benchmarks", "results.jsonl")
+
+# Stages reported in this order; anything else that was timed follows
+STAGE_ORDER = [
+    "file", "audit", "fix", "judge", "llm", "llm_wait", "pylint", "pytest", "exec", "log", "log_write"
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Refactoring Swarm end to end")
+    parser.add_argument("--target_dir", default="buggycodes", help="Buggy code to fix (default: buggycodes)")
+    parser.add_argument(
+        "--tests_dir",
+        default="fixedcodes",
+        help="Directory holding the test_*.py files for the target (default: fixedcodes)",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Measured runs (default: 3)")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs first (default: 1)")
+    parser.add_argument("--workers", type=int, default=1, help="Orchestrator workers (default: 1)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Mock latency jitter in seconds (+/-)")
+    parser.add_argument("--rate_limit_rate", type=float, default=0.0, help="Share of mock calls answered with a 429")
+    parser.add_argument("--retry_after", type=float, default=0.1, help="Retry hint of mock 429s, in seconds")
+    parser.add_argument("--response_bytes", type=int, default=0, help="Pad mock responses to this size")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the mock model's jitter and 429s")
+    parser.add_argument(
+        "--pylint-cache",
+        action="store_true",
+        help="Keep the pylint result cache on (off by default, so every run lints)",
+    )
+    parser.add_argument("--label", default="", help="Free-form tag stored with the result")
+    parser.add_argument("--results", default=RESULTS_FILE, help="Results file (JSON lines)")
+    parser.add_argument("--no-save", action="store_true", help="Do not append this result")
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const="last",
+        help="Compare with the last result of the same configuration, or with a given commit",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown reported as a regression (default: 0.10)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show the swarm's own output")
+    return parser.parse_args()
+
+
+def configure_environment(args) -> None:
+    # Settings are read when the src modules are imported, so this runs first
+    os.environ["MOCK_MODE"] = "true"
+    os.environ["MOCK_LATENCY"] = str(args.latency)
+    os.environ["MOCK_JITTER"] = str(args.jitter)
+    os.environ["MOCK_429_RATE"] = str(args.rate_limit_rate)
+    os.environ["MOCK_RETRY_AFTER"] = str(args.retry_after)
+    os.environ["MOCK_RESPONSE_BYTES"] = str(args.response_bytes)
+    os.environ["MOCK_SEED"] = str(args.seed)
+    os.environ["PYLINT_CACHE"] = "true" if args.pylint_cache else "false"
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+
+def run_once(args, target_dir: str, tests_dir: str, work_root: str) -> dict:
+    from src.orchestrator import Orchestrator
+    from src.tools.staging import stage_directory
+    from src.utils.tracing import get_stage_totals, reset_stage_totals
+
+    # The generated tests import "fixedcodes/<id>.py" relative to the working directory
+    work_dir = os.path.join(work_root, "fixedcodes")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    stage_directory(tests_dir, work_dir, include=["test_*.py"])
+    stage_directory(target_dir, work_dir)
+
+    reset_stage_totals()
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+        result = Orchestrator(work_dir, "", workers=args.workers, incremental=False).run()
+    wall = time.perf_counter() - start
+
+    files = result["completed_files"]
+    usage = result.get("usage", {}).get("totals", {})
+    return {
+        "wall_seconds": wall,
+        "files": len(files),
+        "passed": sum(1 for file_info in files if file_info.get("status") == "PASS"),
+        "file_seconds": [file_info.get("elapsed", 0.0) for file_info in files],
+        "stages": get_stage_totals(),
+        "tokens": usage.get("input_tokens", 0) + usage.get("output_tokens", 0),
+    }
+
+
+def percentile(values: list, pct: float) -> float:
+    """Linear interpolation between closest ranks, like numpy's default."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(args, runs: list) -> dict:
+    file_seconds = [seconds for run in runs for seconds in run["file_seconds"]]
+    walls = [run["wall_seconds"] for run in runs]
+    wall = percentile(walls, 50)
+    stage_names = {name for run in runs for name in run["stages"]}
+    stages = {}
+    for name in sorted(stage_names, key=_stage_rank):
+        totals = [run["stages"].get(name, {"calls": 0, "seconds": 0.0}) for run in runs]
+        stages[name] = {
+            "seconds": sum(total["seconds"] for total in totals) / len(runs),
+            "calls": sum(total["calls"] for total in totals) / len(runs),
+        }
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_revision(),
+        "label": args.label,
+        "config": {
+            "target_dir": args.target_dir,
+            "workers": args.workers,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "rate_limit_rate": args.rate_limit_rate,
+            "retry_after": args.retry_after,
+            "response_bytes": args.response_bytes,
+            "seed": args.seed,
+            "pylint_cache": args.pylint_cache,
+        },
+        "runs": len(runs),
+        "files": runs[0]["files"],
+        "passed": runs[-1]["passed"],
+        "wall_seconds": wall,
+        "files_per_second": runs[0]["files"] / wall if wall else 0.0,
+        "p50_file_seconds": percentile(file_seconds, 50),
+        "p95_file_seconds": percentile(file_seconds, 95),
+        "tokens": sum(run["tokens"] for run in runs) / len(runs),
+        "stages": stages,
+    }
+
+
+def _stage_rank(name: str):
+    return (STAGE_ORDER.index(name), name) if name in STAGE_ORDER else (len(STAGE_ORDER), name)
+
+
+def git_revision() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_results(path: str) -> list:
+    results = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return results
+
+
+def save_result(path: str, summary: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(summary, sort_keys=True) + "\n")
+
+
+def find_baseline(results: list, summary: dict, ref: str):
+    candidates = [result for result in results if result.get("config") == summary["config"]]
+    if ref != "last":
+        candidates = [result for result in candidates if result.get("commit", "").startswith(ref)]
+    return candidates[-1] if candidates else None
+
+
+def print_summary(summary: dict) -> None:
+    print("=" * 60)
+    print(f"⏱️  BENCHMARK ({summary['commit']}{' ' + summary['label'] if summary['label'] else ''})")
+    print("=" * 60)
+    print(
+        f"📁 {summary['files']} files, {summary['passed']} passed, "
+        f"{summary['runs']} runs, config: {json.dumps(summary['config'])}"
+    )
+    print(f"🚀 Throughput: {summary['files_per_second']:.2f} files/s (wall {summary['wall_seconds']:.2f}s)")
+    print(
+        f"📈 Per-file latency: p50 {summary['p50_file_seconds']:.3f}s, "
+        f"p95 {summary['p95_file_seconds']:.3f}s"
+    )
+    print(f"🪙 Tokens per run: {summary['tokens']:.0f}")
+    print("🧩 Stages (seconds per run, summed over threads):")
+    for name, total in summary["stages"].items():
+        print(f"   - {name:<8} {total['seconds']:8.3f}s  ({total['calls']:.0f} calls)")
+
+
+def print_comparison(summary: dict, baseline: dict, threshold: float) -> bool:
+    """Print the deltas against baseline; returns True if anything regressed."""
+    print(f"\n🔍 Compared with {baseline.get('commit')} ({baseline.get('timestamp')})")
+    # (metric, label, True if higher is better)
+    metrics = [
+        ("files_per_second", "files/s", True),
+        ("wall_seconds", "wall", False),
+        ("p50_file_seconds", "p50", False),
+        ("p95_file_seconds", "p95", False),
+    ]
+    regressed = False
+    for key, label, higher_is_better in metrics:
+        before, after = baseline.get(key) or 0.0, summary[key]
+        change = (after - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        flag = "❌ regression" if worse > threshold else ""
+        regressed = regressed or worse > threshold
+        print(f"   - {label:<8} {before:10.3f} -> {after:10.3f} ({change:+.1%}) {flag}")
+    for name, total in summary["stages"].items():
+        before = baseline.get("stages", {}).get(name, {}).get("seconds")
+        if before:
+            change = (total["seconds"] - before) / before
+            print(f"   - {name:<8} {before:10.3f} -> {total['seconds']:10.3f} ({change:+.1%})")
+    return regressed
+
+
+def main():
+    args = parse_args()
+    target_dir = os.path.abspath(args.target_dir)
+    tests_dir = os.path.abspath(args.tests_dir)
+    if not os.path.isdir(target_dir):
+        print(f"❌ Input directory {args.target_dir} not found (run generate_dataset.py first).")
+        sys.exit(1)
+
+    configure_environment(args)
+    from src.utils.logger import shutdown_logging
+
+    work_root = tempfile.mkdtemp(prefix="swarm-bench-")
+    previous_dir = os.getcwd()
+    # Logs, caches and the generated tests' relative paths all resolve inside work_root
+    os.chdir(work_root)
+    runs = []
+    try:
+        for index in range(args.warmup + args.runs):
+            measured = index >= args.warmup
+            run = run_once(args, target_dir, tests_dir, work_root)
+            kind = "run" if measured else "warmup"
+            print(
+                f"   {kind} {index + 1 - (args.warmup if measured else 0)}: "
+                f"{run['files']} files in {run['wall_seconds']:.2f}s"
+            )
+            if measured:
+                runs.append(run)
+    finally:
+        shutdown_logging()
+        os.chdir(previous_dir)
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    if not runs:
+        print("⚠️ No measured runs.")
+        return
+
+    summary = summarize(args, runs)
+    print_summary(summary)
+
+    regressed = False
+    if args.compare:
+        baseline = find_baseline(load_results(args.results), summary, args.compare)
+        if baseline is None:
+            print(f"\n⚠️ No earlier result with this configuration to compare with ({args.compare}).")
+        else:
+            regressed = print_comparison(summary, baseline, args.threshold)
+
+    if not args.no_save:
+        save_result(args.results, summary)
+        print(f"\n💾 Result appended to {os.path.relpath(args.results)}")
+
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,12 @@
+import argparse
 import os
+import random
 import shutil
+from collections import Counter
 
-def generate_dataset():
-    print("🧪 Generating Test Dataset...")
-    
-    # Define directories
-    buggy_dir = "buggycodes"
-    fixed_dir = "fixedcodes"
-    tests_dir = "fixedcodes"
-    
-    # Create/Clean directories
-    for d in [buggy_dir, fixed_dir, tests_dir]:
-        if os.path.exists(d):
-            shutil.rmtree(d)
-        os.makedirs(d)
-    
-    # Helper to generate robust import code for 1.py, 2.py etc.
-    def get_import_block(id):
-        return f"""import pytest
+# Helper to generate robust import code for 1.py, 2.py etc.
+def get_import_block(id):
+    return f"""import pytest
 import importlib.util
 import sys
 import os
@@ -34,6 +23,21 @@ def import_code():
 module = import_code()
 """
 
+
+def generate_dataset():
+    print("🧪 Generating Test Dataset...")
+    
+    # Define directories
+    buggy_dir = "buggycodes"
+    fixed_dir = "fixedcodes"
+    tests_dir = "fixedcodes"
+    
+    # Create/Clean directories
+    for d in [buggy_dir, fixed_dir, tests_dir]:
+        if os.path.exists(d):
+            shutil.rmtree(d)
+        os.makedirs(d)
+    
     dataset = [
         {
             "id": "1",
@@ -236,5 +240,410 @@ def test_check_password():
     print(f"✅ Generated {len(dataset)} test files in '{tests_dir}'")
     print(f"   Created empty '{fixed_dir}' directory for outputs.")
 
+# --- Synthetic corpus (load testing) ---------------------------------------
+#
+# Modules are assembled from templates: one or more buggy functions (the same
+# bug families as the hand-written dataset), functions that use imported
+# modules (the import fan-out, including earlier corpus modules), and plain
+# arithmetic functions that bring the file up to its target size. Every
+# function gets a test; only the buggy ones fail before the fix.
+
+BUG_TEMPLATES = {
+    "zero_division": (
+        """def {fn}(nums):
+    return sum(nums) / len(nums)
+""",
+        """
+def test_{fn}():
+    assert module.{fn}([1, 2, 3]) == 2.0
+    assert module.{fn}([]) == 0
+""",
+    ),
+    "palindrome": (
+        """def {fn}(s):
+    rev = ""
+    for i in range(len(s)):
+        rev += s[len(s)-1-i]
+    if rev == s:
+        return True
+""",
+        """
+def test_{fn}():
+    assert module.{fn}("racecar") is True
+    assert module.{fn}("hello") is False
+""",
+    ),
+    "unclosed_file": (
+        """def {fn}(path):
+    file = open(path, 'r')
+    data = file.read()
+    file.close()
+    return data.strip()
+""",
+        """
+def test_{fn}(tmp_path):
+    f = tmp_path / "data.txt"
+    f.write_text("hello\\n")
+    assert module.{fn}(str(f)) == "hello"
+""",
+    ),
+    "swap_comparison": (
+        """def {fn}(arr):
+    n = len(arr)
+    for i in range(n):
+        for j in range(0, n-i-1):
+            if arr[j] > arr[j+1] :
+                arr[j], arr[j+1] == arr[j+1], arr[j]
+    return arr
+""",
+        """
+def test_{fn}():
+    assert module.{fn}([3, 1, 2]) == [1, 2, 3]
+    assert module.{fn}([]) == []
+""",
+    ),
+    "mutable_default": (
+        """def {fn}(item, seen=[]):
+    seen.append(item)
+    return seen
+""",
+        """
+def test_{fn}():
+    module.{fn}(1)
+    assert module.{fn}(2) == [2]
+""",
+    ),
+    "argument_side_effect": (
+        """def {fn}(d1, d2):
+    for k in d2:
+        d1[k] = d2[k]
+    return d1
+""",
+        """
+def test_{fn}():
+    d1 = {{'a': 1}}
+    assert module.{fn}(d1, {{'b': 2}}) == {{'a': 1, 'b': 2}}
+    assert d1 == {{'a': 1}}, "Side effect detected: d1 was modified!"
+""",
+    ),
+    "factorial": (
+        """def factorial(n):
+    if n == 0:
+        return 1
+    else:
+        return n * factorial(n - 1)
+""",
+        """
+def test_factorial():
+    assert module.factorial(5) == 120
+    with pytest.raises(ValueError):
+        module.factorial(-1)
+""",
+    ),
+    "class_naming": (
+        """class {fn}:
+    def __init__(self, n, a):
+        self.name = n
+        self.age = a
+
+    def describe(self):
+        print(self.name + " is " + self.age)
+""",
+        """
+def test_{fn}():
+    cls = getattr(module, "{cap}", None)
+    assert cls is not None, "class {fn} was not renamed to {cap}"
+    cls("Bob", 25).describe()
+""",
+    ),
+}
+
+# (import, function template, test template) for functions that use a stdlib module
+IMPORT_TEMPLATES = {
+    "math": (
+        """def {fn}(values):
+    return round(math.fsum(values), 6)
+""",
+        """
+def test_{fn}():
+    assert module.{fn}([0.1] * 10) == 1.0
+""",
+    ),
+    "statistics": (
+        """def {fn}(values):
+    return statistics.median(values)
+""",
+        """
+def test_{fn}():
+    assert module.{fn}([3, 1, 2]) == 2
+""",
+    ),
+    "json": (
+        """def {fn}(data):
+    return json.loads(json.dumps(data, sort_keys=True))
+""",
+        """
+def test_{fn}():
+    assert module.{fn}({{"b": 1, "a": 2}}) == {{"a": 2, "b": 1}}
+""",
+    ),
+    "collections": (
+        """def {fn}(words):
+    return collections.Counter(words).most_common(1)[0][0]
+""",
+        """
+def test_{fn}():
+    assert module.{fn}(["a", "b", "a"]) == "a"
+""",
+    ),
+    "itertools": (
+        """def {fn}(values):
+    return list(itertools.accumulate(values))
+""",
+        """
+def test_{fn}():
+    assert module.{fn}([1, 2, 3]) == [1, 3, 6]
+""",
+    ),
+    "functools": (
+        """def {fn}(values):
+    return functools.reduce(lambda acc, value: acc * value, values, 1)
+""",
+        """
+def test_{fn}():
+    assert module.{fn}([2, 3, 4]) == 24
+""",
+    ),
+    "re": (
+        """def {fn}(text):
+    return len(re.findall(r"[a-z]+", text))
+""",
+        """
+def test_{fn}():
+    assert module.{fn}("a bb ccc") == 3
+""",
+    ),
+    "string": (
+        """def {fn}(text):
+    return string.capwords(text)
+""",
+        """
+def test_{fn}():
+    assert module.{fn}("hello world") == "Hello World"
+""",
+    ),
+}
+
+_VERBS = ["compute", "load", "parse", "collect", "format", "count", "build", "scan", "resolve", "render", "normalize", "score"]
+_NOUNS = ["orders", "users", "items", "records", "events", "totals", "tokens", "rows", "prices", "labels", "batches", "entries"]
+_MODULUS = 1000003
+_SEED_INPUT = 7
+
+
+def _parse_range(text: str) -> tuple:
+    """"3" -> (3, 3); "2-8" -> (2, 8)."""
+    low, _, high = text.partition("-")
+    low = int(low)
+    high = int(high) if high else low
+    if low < 0 or high < low:
+        raise argparse.ArgumentTypeError(f"invalid range: {text}")
+    return low, high
+
+
+def _arithmetic_function(fn: str, statements: int, rng: random.Random) -> tuple:
+    """A straight-line function of `statements` steps, and its value for _SEED_INPUT."""
+    lines = [f"def {fn}(seed):", "    value = seed"]
+    value = _SEED_INPUT
+    for _ in range(statements):
+        if rng.random() < 0.5:
+            a, b = rng.randint(2, 97), rng.randint(1, 997)
+            lines.append(f"    value = (value * {a} + {b}) % {_MODULUS}")
+            value = (value * a + b) % _MODULUS
+        else:
+            x = rng.randint(1, 4095)
+            lines.append(f"    value = value ^ {x}")
+            value = value ^ x
+    lines.append("    return value")
+    return "\n".join(lines) + "\n", value
+
+
+def _snake_to_cap(name: str) -> str:
+    return "".join(part.capitalize() for part in name.split("_"))
+
+
+def generate_synthetic_module(
+    module_id: str,
+    rng: random.Random,
+    bug_types: list,
+    functions: tuple,
+    lines: tuple,
+    fanout: tuple,
+    bugs: tuple,
+    helpers: list,
+) -> tuple:
+    """
+    Build one buggy module and its test file.
+
+    helpers lists (module_id, function, value_at_seed) of earlier modules that
+    may be imported. Returns (code, test_code, bug types used, this module's
+    arithmetic helpers).
+    """
+    names = set()
+
+    def new_name(base: str = None):
+        base = base or f"{rng.choice(_VERBS)}_{rng.choice(_NOUNS)}"
+        name, suffix = base, 2
+        while name in names:
+            name, suffix = f"{base}_{suffix}", suffix + 1
+        names.add(name)
+        return name
+
+    n_bugs = min(rng.randint(*bugs), len(bug_types))
+    n_imports = rng.randint(*fanout)
+    n_functions = max(rng.randint(*functions), n_bugs + n_imports + 1)
+    target_lines = rng.randint(*lines)
+
+    blocks, tests, imports, used_bugs = [], [], [], []
+    for bug in rng.sample(bug_types, n_bugs):
+        template, test_template = BUG_TEMPLATES[bug]
+        if bug == "factorial":
+            fn = new_name("factorial")
+        elif bug == "class_naming":
+            fn = new_name(f"{rng.choice(_NOUNS)}_record")
+        else:
+            fn = new_name()
+        blocks.append(template.format(fn=fn))
+        tests.append(test_template.format(fn=fn, cap=_snake_to_cap(fn)))
+        used_bugs.append(bug)
+
+    # Import fan-out: stdlib modules and, when there are any, recent corpus modules
+    stdlib = rng.sample(list(IMPORT_TEMPLATES), min(n_imports, len(IMPORT_TEMPLATES)))
+    for source in stdlib:
+        if helpers and rng.random() < 0.5:
+            other_id, helper, helper_value = rng.choice(helpers[-50:])
+            # The imported name must not clash with anything defined here
+            if helper not in names:
+                names.add(helper)
+                source = None
+        fn = new_name()
+        if source is None:
+            imports.append(f"from {other_id} import {helper}")
+            blocks.append(f"def {fn}(seed):\n    return {helper}(seed) + 1\n")
+            tests.append(
+                f"\ndef test_{fn}():\n    assert module.{fn}({_SEED_INPUT}) == {helper_value + 1}\n"
+            )
+        else:
+            template, test_template = IMPORT_TEMPLATES[source]
+            imports.append(f"import {source}")
+            blocks.append(template.format(fn=fn))
+            tests.append(test_template.format(fn=fn))
+
+    # Plain functions share whatever is left of the line budget
+    n_plain = max(1, n_functions - len(blocks))
+    used_lines = sum(block.count("\n") + 2 for block in blocks) + len(imports) + 2
+    statements = max(1, (target_lines - used_lines) // n_plain - 4)
+    own_helpers = []
+    for _ in range(n_plain):
+        fn = new_name()
+        block, value = _arithmetic_function(fn, rng.randint(max(1, statements // 2), statements), rng)
+        blocks.append(block)
+        tests.append(f"\ndef test_{fn}():\n    assert module.{fn}({_SEED_INPUT}) == {value}\n")
+        own_helpers.append((module_id, fn, value))
+
+    order = list(range(len(blocks)))
+    rng.shuffle(order)
+    header = "\n".join(sorted(imports)) + "\n\n\n" if imports else ""
+    code = header + "\n\n".join(blocks[i] for i in order)
+    test_code = get_import_block(module_id) + "".join(tests[i] for i in order)
+    return code, test_code, used_bugs, own_helpers
+
+
+def generate_synthetic_corpus(
+    count: int,
+    seed: int = 0,
+    bug_types: list = None,
+    functions: tuple = (2, 6),
+    lines: tuple = (15, 120),
+    fanout: tuple = (0, 3),
+    bugs: tuple = (1, 1),
+    buggy_dir: str = "buggycodes",
+    tests_dir: str = "fixedcodes",
+) -> Counter:
+    """
+    Write `count` buggy modules (syn_00000.py, ...) and their test_<id>.py files.
+
+    The same seed and settings always produce the same corpus. Ranges are
+    (low, high) and sampled per module. Returns how often each bug type was used.
+    """
+    print(f"🧪 Generating synthetic corpus: {count} modules (seed {seed})...")
+    rng = random.Random(seed)
+    bug_types = list(bug_types or BUG_TEMPLATES)
+    for d in [buggy_dir, tests_dir]:
+        if os.path.exists(d):
+            shutil.rmtree(d)
+        os.makedirs(d)
+
+    helpers = []
+    bug_counts = Counter()
+    total_lines = 0
+    for index in range(count):
+        module_id = f"syn_{index:05d}"
+        code, test_code, used_bugs, own_helpers = generate_synthetic_module(
+            module_id, rng, bug_types, functions, lines, fanout, bugs, helpers
+        )
+        helpers.extend(own_helpers)
+        bug_counts.update(used_bugs)
+        total_lines += code.count("\n")
+        with open(os.path.join(buggy_dir, f"{module_id}.py"), "w") as f:
+            f.write(code)
+        with open(os.path.join(tests_dir, f"test_{module_id}.py"), "w") as f:
+            f.write(test_code)
+
+    print(f"✅ Generated {count} buggy modules in '{buggy_dir}' ({total_lines} lines)")
+    print(f"✅ Generated {count} test files in '{tests_dir}'")
+    for bug, bug_count in sorted(bug_counts.items()):
+        print(f"   - {bug}: {bug_count}")
+    return bug_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the buggy dataset and its tests")
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        metavar="N",
+        help="Generate N synthetic modules instead of the ten hand-written files",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus (default: 0)")
+    parser.add_argument(
+        "--bug-types",
+        default=",".join(BUG_TEMPLATES),
+        help="Comma-separated bug types to draw from (default: all)",
+    )
+    parser.add_argument("--bugs", type=_parse_range, default=(1, 1), help="Buggy functions per module, e.g. 1-2 (default: 1)")
+    parser.add_argument("--functions", type=_parse_range, default=(2, 6), help="Functions per module (default: 2-6)")
+    parser.add_argument("--lines", type=_parse_range, default=(15, 120), help="Target lines per module (default: 15-120)")
+    parser.add_argument("--fanout", type=_parse_range, default=(0, 3), help="Imports per module (default: 0-3)")
+    args = parser.parse_args()
+
+    if args.synthetic is None:
+        generate_dataset()
+        return
+
+    bug_types = [bug.strip() for bug in args.bug_types.split(",") if bug.strip()]
+    unknown = sorted(set(bug_types) - set(BUG_TEMPLATES))
+    if unknown:
+        parser.error(f"unknown bug types: {', '.join(unknown)} (known: {', '.join(BUG_TEMPLATES)})")
+    generate_synthetic_corpus(
+        args.synthetic,
+        seed=args.seed,
+        bug_types=bug_types,
+        functions=args.functions,
+        lines=args.lines,
+        fanout=args.fanout,
+        bugs=args.bugs,
+    )
+
+
 if __name__ == "__main__":
-    generate_dataset()
+    main()
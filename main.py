@@ -1,10 +1,21 @@
 import argparse
 import sys
 import os
-import shutil
 from dotenv import load_dotenv
 from src.orchestrator import Orchestrator
-from src.utils.logger import log_experiment, ActionType
+from src.tools.analysis_tools import get_pylint_stats
+from src.tools.staging import stage_directory
+from src.utils.model_utils import get_llm_cache_stats
+from src.utils.manifest import Manifest, MANIFEST_NAME
+from src.utils.checkpoint import Checkpoint, CHECKPOINT_NAME
+from src.utils.tracing import enable_tracing, export_chrome_trace, get_stage_totals
+from src.utils.logger import (
+    log_experiment,
+    ActionType,
+    flush_logs,
+    shutdown_logging,
+    export_json_log,
+)
 
 load_dotenv()
 
@@ -25,6 +36,56 @@ def main():
         required=False,
         help="Path to save the fixed code (Output). If set, input files are copied here first.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of files fixed and judged concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-process every file, even those unchanged since a passing run",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its checkpoint instead of starting over",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        help="Only copy files matching this glob into the output directory (repeatable)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        help="Gitignore-style pattern to leave out of the output directory (repeatable)",
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Copy files even if a .gitignore in the target excludes them",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="Hardlink non-Python files into the output directory instead of copying them",
+    )
+    parser.add_argument(
+        "--stage-compare",
+        choices=["mtime", "hash"],
+        default="mtime",
+        help="How staging decides a file is unchanged: by size and mtime (default) or by content hash",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        metavar="PATH",
+        help="Write a trace of the run to PATH (open it in chrome://tracing or ui.perfetto.dev)",
+    )
     args = parser.parse_args()
 
     if not os.path.exists(args.target_dir):
@@ -33,22 +94,47 @@ def main():
 
     # If output_dir is specified, set it up
     work_dir = args.target_dir
+    resume = args.resume and Checkpoint.exists(args.output_dir or args.target_dir)
+    if args.resume and not resume:
+        print("⚠️ No checkpoint found; starting a fresh run.")
 
-    if args.output_dir:
+    if resume:
+        # The work directory already holds the interrupted run's partial fixes
+        work_dir = args.output_dir or args.target_dir
+        print(f"↩️  Resuming from checkpoint in {work_dir}")
+    elif args.output_dir:
         print(f"📦 Setting up output directory: {args.output_dir}")
         if not os.path.exists(args.output_dir):
             os.makedirs(args.output_dir)
 
-        # Copy all files from target to output
-        # We use a simple copy loop to avoid copying .git or other garbage if using shutil.copytree indiscriminately
-        # But for this purpose, let's just copy the python files or the whole content?
-        # The user wants "index by 1..10.py", implying a flat structure.
-        # Let's copy everything.
+        # Stage the target into the output directory: ignored trees (.git, venvs,
+        # caches, .gitignore entries) are skipped and unchanged files are not copied again
         try:
-            # If directory exists and is not empty, we might overwrite. Safe enough for this lab.
-            # We use dirs_exist_ok=True (Python 3.8+)
-            shutil.copytree(args.target_dir, args.output_dir, dirs_exist_ok=True)
-            print(f"✅ Copied input files to {args.output_dir}")
+            # Fixed outputs of unchanged inputs that passed last time are kept as they are
+            manifest = Manifest.load(args.output_dir)
+
+            def keep_fixed_output(rel_path, source_path, output_path):
+                return (
+                    not args.force
+                    and rel_path.endswith(".py")
+                    and manifest.is_unchanged_input(rel_path, source_path, output_path)
+                )
+
+            stats = stage_directory(
+                args.target_dir,
+                args.output_dir,
+                include=args.include,
+                exclude=[*args.exclude, MANIFEST_NAME, CHECKPOINT_NAME],
+                use_gitignore=not args.no_gitignore,
+                hardlink=args.hardlink,
+                compare=args.stage_compare,
+                skip=keep_fixed_output,
+            )
+            print(
+                f"✅ Staged input files in {args.output_dir} "
+                f"(copied: {stats['copied']}, linked: {stats['linked']}, "
+                f"unchanged: {stats['unchanged']}, kept fixed: {stats['skipped']})"
+            )
             work_dir = args.output_dir
         except Exception as e:
             print(f"❌ Failed to copy files: {e}")
@@ -61,6 +147,8 @@ def main():
         sys.exit(1)
 
     print(f"🚀 STARTING REFACTORING SWARM ON: {work_dir}")
+    if args.trace:
+        enable_tracing()
 
     log_experiment(
         agent_name="System",
@@ -72,9 +160,16 @@ def main():
         },
         status="SUCCESS",
     )
+    flush_logs(fsync=True)
 
     try:
-        orchestrator = Orchestrator(work_dir, api_key)
+        orchestrator = Orchestrator(
+            work_dir,
+            api_key,
+            workers=args.workers,
+            incremental=not args.force,
+            resume=resume,
+        )
         result = orchestrator.run()
 
         print("\n" + "=" * 50)
@@ -92,11 +187,63 @@ def main():
                 or file_info.get("status", "RETRY")
             ).upper()
             status = "✅ PASS" if status_value == "PASS" else "🔄 RETRY"
+            file_usage = file_info.get("usage") or {}
+            tokens = file_usage.get("input_tokens", 0) + file_usage.get("output_tokens", 0)
+            print(
+                f"   - {file_info['file']}: {status} (iterations: {file_info['iterations']}, "
+                f"tokens: {tokens})"
+            )
+        skipped_files = result.get("skipped_files", [])
+        if skipped_files:
+            print(f"⏭️  Unchanged since a passing run (skipped): {len(skipped_files)}")
+
+        final_tests = result.get("final_tests")
+        if final_tests:
+            gate = "✅ PASSED" if final_tests["passed"] else "❌ FAILED"
+            print(f"🧪 Final test gate: {gate} (exit code: {final_tests['return_code']})")
+
+        pylint_stats = get_pylint_stats()
+        if pylint_stats["runs"]:
+            print(
+                f"🧹 Pylint: {pylint_stats['runs']} runs in {pylint_stats['seconds']:.2f}s "
+                f"(avg {pylint_stats['seconds'] / pylint_stats['runs'] * 1000:.0f} ms, "
+                f"in-process: {pylint_stats['inprocess']}, subprocess: {pylint_stats['subprocess']})"
+            )
+        if pylint_stats["cache_hits"] or pylint_stats["cache_misses"]:
+            print(
+                f"🗃️  Pylint cache: {pylint_stats['cache_hits']} hits, "
+                f"{pylint_stats['cache_misses']} misses"
+            )
+
+        llm_cache_stats = get_llm_cache_stats()
+        if llm_cache_stats["hits"] or llm_cache_stats["misses"]:
             print(
-                f"   - {file_info['file']}: {status} (iterations: {file_info['iterations']})"
+                f"🗃️  LLM cache: {llm_cache_stats['hits']} hits, "
+                f"{llm_cache_stats['misses']} misses "
+                f"(hit rate {llm_cache_stats['hit_rate']:.0%})"
             )
 
+        usage = result.get("usage")
+        if usage and usage["totals"]["calls"]:
+            print_usage(usage)
+        if result.get("budget_exhausted"):
+            print(
+                f"💸 Budget exhausted: {len(result['unfinished_files'])} files unfinished. "
+                "Rerun with --resume (and a larger LLM_TOKEN_BUDGET / LLM_COST_BUDGET) to continue."
+            )
+
+        stage_totals = get_stage_totals()
+        if stage_totals:
+            print("⏱️  Time by stage (summed over threads; nested stages overlap):")
+            for name, total in sorted(
+                stage_totals.items(), key=lambda item: item[1]["seconds"], reverse=True
+            ):
+                print(f"   - {name}: {total['seconds']:.2f}s ({total['calls']} calls)")
+
         print("=" * 50)
+        if not result["mission_complete"]:
+            print("⚠️ MISSION_INCOMPLETE")
+            sys.exit(1)
         print("✅ MISSION_COMPLETE")
 
         if args.output_dir:
@@ -126,6 +273,32 @@ def main():
             status="FAILURE",
         )
         sys.exit(1)
+    finally:
+        # Run boundary: drain the background log writer, fsync, refresh the JSON array export
+        shutdown_logging()
+        export_json_log()
+        if args.trace:
+            span_count = export_chrome_trace(args.trace)
+            print(f"🧭 Trace written to {args.trace} ({span_count} spans)")
+
+
+def print_usage(usage: dict) -> None:
+    totals = usage["totals"]
+    print(
+        f"🪙 Tokens: {totals['input_tokens']} in / {totals['output_tokens']} out "
+        f"over {totals['calls']} calls ({totals['cached_calls']} cached), est. ${totals['cost']:.4f}"
+    )
+    for agent, bucket in sorted(usage["by_agent"].items()):
+        print(
+            f"   - {agent}: {bucket['input_tokens']} in / {bucket['output_tokens']} out "
+            f"({bucket['calls']} calls, ${bucket['cost']:.4f})"
+        )
+    if len(usage["by_iteration"]) > 1:
+        per_iteration = ", ".join(
+            f"#{iteration}: {bucket['input_tokens'] + bucket['output_tokens']}"
+            for iteration, bucket in usage["by_iteration"].items()
+        )
+        print(f"   - Tokens by iteration: {per_iteration}")
 
 
 if __name__ == "__main__":
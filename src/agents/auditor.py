@@ -1,10 +1,24 @@
+import itertools
 import json
 import os
-from src.prompts.auditor_prompt import AUDITOR_SYSTEM_PROMPT
-from src.tools.file_tools import read_file, list_python_files
-from src.tools.analysis_tools import run_pylint
+from src.prompts.auditor_prompt import AUDITOR_SYSTEM_PROMPT, AUDITOR_BATCH_PROMPT
+from src.tools.file_tools import read_file, list_python_files, iter_python_files
+from src.tools.analysis_tools import run_pylint, run_pylint_batch
 from src.utils.logger import log_experiment, ActionType
-from src.utils.model_utils import get_model, call_with_retry
+from src.utils.model_utils import get_model, call_with_retry, get_last_usage
+from src.utils.prompt_budget import PromptBudget
+from src.utils.tokens import estimate_tokens
+from src.utils.tracing import trace_context
+from src.utils.usage import BudgetExceededError
+
+# Files linted per pylint run while streaming analyses
+AUDIT_LINT_CHUNK = int(os.getenv("AUDIT_LINT_CHUNK", "32"))
+
+# Multi-file audit prompts: small files are packed together up to this many
+# estimated tokens per request (0 = one request per file)
+AUDIT_BATCH_TOKENS = int(os.getenv("AUDIT_BATCH_TOKENS", "0"))
+# Files above this size (code + pylint output) always get their own prompt
+AUDIT_BATCH_FILE_TOKENS = int(os.getenv("AUDIT_BATCH_FILE_TOKENS", "1500"))
 
 
 class AuditorAgent:
@@ -14,17 +28,177 @@ class AuditorAgent:
 
     def analyze(self, target_dir: str) -> dict:
         python_files = list_python_files(target_dir)
-        all_analyses = []
+        all_analyses = list(self.iter_analyses(target_dir, python_files))
+        return {"analyses": all_analyses, "total_files": len(python_files)}
 
-        print(f"   📂 Found {len(python_files)} Python files to analyze")
+    def iter_analyses(self, target_dir: str, python_files=None):
+        """
+        Yield each file's analysis as soon as it is ready, so fixing can start early.
 
-        for file_path in python_files:
-            try:
-                print(f"   📄 Analyzing: {file_path}")
-                code_content = read_file(file_path)
-                pylint_result = run_pylint(file_path)
+        python_files may be any iterable, including a lazy discovery generator;
+        it is consumed one lint chunk at a time.
+        """
+        if python_files is None:
+            python_files = iter_python_files(target_dir)
+        python_files = iter(python_files)
+        found = 0
+
+        # Lint in chunks: one pylint run per chunk instead of one per file,
+        # without holding the first analysis back until the whole target is linted
+        while True:
+            chunk = list(itertools.islice(python_files, AUDIT_LINT_CHUNK))
+            if not chunk:
+                break
+            found += len(chunk)
+            print(f"   📂 Found {found} Python files to analyze so far")
+            pylint_results = run_pylint_batch(chunk)
+
+            # Consecutive small files are packed into one prompt; order is preserved
+            group = []
+            group_tokens = 0
+            for file_path in chunk:
+                pylint_result = pylint_results.get(file_path)
+                batch_entry = self._batch_entry(file_path, pylint_result)
+                if batch_entry is not None:
+                    if group and group_tokens + batch_entry["tokens"] > AUDIT_BATCH_TOKENS:
+                        yield from self._analyze_group(group)
+                        group, group_tokens = [], 0
+                    group.append(batch_entry)
+                    group_tokens += batch_entry["tokens"]
+                    continue
+
+                yield from self._analyze_group(group)
+                group, group_tokens = [], 0
+                analysis = self._analyze_file(file_path, pylint_result)
+                if analysis is not None:
+                    yield analysis
+
+            yield from self._analyze_group(group)
+
+    def _batch_entry(self, file_path: str, pylint_result: dict):
+        """Return the file's prompt material if it is small enough to share a prompt."""
+        if not AUDIT_BATCH_TOKENS or not pylint_result:
+            return None
+        try:
+            code_content = read_file(file_path)
+        except Exception:
+            return None
+        tokens = estimate_tokens(code_content) + estimate_tokens(pylint_result["output"])
+        if tokens > AUDIT_BATCH_FILE_TOKENS:
+            return None
+        return {
+            "file_path": file_path,
+            "code": code_content,
+            "pylint_result": pylint_result,
+            "tokens": tokens,
+        }
+
+    def _analyze_group(self, group: list):
+        """Audit several small files with one request; unmatched files fall back to single prompts."""
+        if len(group) == 1:
+            entry = group[0]
+            analysis = self._analyze_file(entry["file_path"], entry["pylint_result"])
+            if analysis is not None:
+                yield analysis
+            return
+        if not group:
+            return
+
+        file_paths = [entry["file_path"] for entry in group]
+        sections = []
+        for entry in group:
+            sections.append(f"""FILE PATH: {entry['file_path']}
+
+CURRENT PYLINT SCORE: {entry['pylint_result']['score']}/10
+
+PYLINT OUTPUT:
+{entry['pylint_result']['output']}
+
+CODE:
+```python
+{entry['code']}
+```""")
+
+        user_prompt = f"""{AUDITOR_SYSTEM_PROMPT}
 
-                user_prompt = f"""{AUDITOR_SYSTEM_PROMPT}
+{AUDITOR_BATCH_PROMPT}
+
+Analyze these {len(group)} Python files and provide a refactoring plan for each.
+
+""" + "\n\n=====\n\n".join(sections)
+
+        by_path = {}
+        try:
+            print(f"   📄 Analyzing {len(group)} small files in one request")
+            with trace_context(files=file_paths):
+                response_text = call_with_retry(self.model, user_prompt, agent="Auditor_Agent")
+
+            log_experiment(
+                agent_name="Auditor_Agent",
+                model_used=self.model_name,
+                action=ActionType.ANALYSIS,
+                details={
+                    "files_analyzed": file_paths,
+                    "input_prompt": user_prompt[:1000],
+                    "output_response": response_text[:1000],
+                    "batch_size": len(group),
+                    "usage": get_last_usage(),
+                },
+                status="SUCCESS",
+            )
+
+            clean_response = response_text
+            if "```json" in clean_response:
+                clean_response = clean_response.split("```json")[1].split("```")[0]
+            elif "```" in clean_response:
+                clean_response = clean_response.split("```")[1].split("```")[0]
+            parsed = json.loads(clean_response.strip())
+            items = parsed.get("analyses", []) if isinstance(parsed, dict) else parsed
+
+            basenames = {os.path.basename(path): path for path in file_paths}
+            for item in items if isinstance(items, list) else []:
+                if not isinstance(item, dict):
+                    continue
+                reported_path = str(item.get("file_path", ""))
+                matched = (
+                    reported_path
+                    if reported_path in file_paths
+                    else basenames.get(os.path.basename(reported_path))
+                )
+                if matched and matched not in by_path:
+                    by_path[matched] = item
+        except BudgetExceededError:
+            raise
+        except Exception as e:
+            print(f"   ⚠️ Batched audit failed ({str(e)}), falling back to one request per file")
+
+        for entry in group:
+            file_path = entry["file_path"]
+            analysis = by_path.get(file_path)
+            if analysis is None:
+                analysis = self._analyze_file(file_path, entry["pylint_result"])
+                if analysis is not None:
+                    yield analysis
+                continue
+
+            analysis["file_path"] = file_path
+            analysis["original_code"] = entry["code"]
+            analysis["original_pylint_score"] = entry["pylint_result"]["score"]
+            print(f"   ✅ Analysis complete for {file_path}")
+            yield analysis
+
+    def _analyze_file(self, file_path: str, pylint_result: dict = None):
+        try:
+            print(f"   📄 Analyzing: {file_path}")
+            code_content = read_file(file_path)
+            pylint_result = pylint_result or run_pylint(file_path)
+
+            budget = PromptBudget()
+            budget.reserve(AUDITOR_SYSTEM_PROMPT, code_content)
+            budget.section("pylint", pylint_result["output"], cap=1500)
+            sections = budget.allocate()
+
+            user_prompt = f"""{AUDITOR_SYSTEM_PROMPT}
 
 Analyze this Python file and provide a refactoring plan.
 
@@ -33,7 +207,7 @@ FILE PATH: {file_path}
 CURRENT PYLINT SCORE: {pylint_result['score']}/10
 
 PYLINT OUTPUT:
-{pylint_result['output'][:]}
+{sections['pylint']}
 
 CODE:
 ```python
@@ -42,56 +216,59 @@ CODE:
 
 Provide your analysis as a JSON object."""
 
-                response_text = call_with_retry(self.model, user_prompt)
-
-                log_experiment(
-                    agent_name="Auditor_Agent",
-                    model_used=self.model_name,
-                    action=ActionType.ANALYSIS,
-                    details={
-                        "file_analyzed": file_path,
-                        "input_prompt": user_prompt[:1000],
-                        "output_response": response_text[:1000],
-                        "pylint_score": pylint_result["score"],
-                    },
-                    status="SUCCESS",
-                )
+            with trace_context(file=file_path):
+                response_text = call_with_retry(self.model, user_prompt, agent="Auditor_Agent")
 
-                try:
-                    clean_response = response_text
-                    if "```json" in clean_response:
-                        clean_response = clean_response.split("```json")[1].split(
-                            "```"
-                        )[0]
-                    elif "```" in clean_response:
-                        clean_response = clean_response.split("```")[1].split("```")[0]
-                    analysis = json.loads(clean_response.strip())
-                except json.JSONDecodeError:
-                    analysis = {
-                        "file_path": file_path,
-                        "raw_analysis": response_text,
-                        "pylint_score": pylint_result["score"],
-                    }
-
-                analysis["file_path"] = file_path
-                analysis["original_code"] = code_content
-                analysis["original_pylint_score"] = pylint_result["score"]
-                all_analyses.append(analysis)
-                print(f"   ✅ Analysis complete for {file_path}")
-
-            except Exception as e:
-                print(f"   ❌ Error analyzing {file_path}: {str(e)}")
-                log_experiment(
-                    agent_name="Auditor_Agent",
-                    model_used=self.model_name,
-                    action=ActionType.ANALYSIS,
-                    details={
-                        "file_analyzed": file_path,
-                        "input_prompt": f"Analysis request for {file_path}",
-                        "output_response": f"Error: {str(e)}",
-                        "error": str(e),
-                    },
-                    status="FAILURE",
-                )
+            log_experiment(
+                agent_name="Auditor_Agent",
+                model_used=self.model_name,
+                action=ActionType.ANALYSIS,
+                details={
+                    "file_analyzed": file_path,
+                    "input_prompt": user_prompt[:1000],
+                    "output_response": response_text[:1000],
+                    "pylint_score": pylint_result["score"],
+                    "usage": get_last_usage(),
+                },
+                status="SUCCESS",
+            )
 
-        return {"analyses": all_analyses, "total_files": len(python_files)}
+            try:
+                clean_response = response_text
+                if "```json" in clean_response:
+                    clean_response = clean_response.split("```json")[1].split(
+                        "```"
+                    )[0]
+                elif "```" in clean_response:
+                    clean_response = clean_response.split("```")[1].split("```")[0]
+                analysis = json.loads(clean_response.strip())
+            except json.JSONDecodeError:
+                analysis = {
+                    "file_path": file_path,
+                    "raw_analysis": response_text,
+                    "pylint_score": pylint_result["score"],
+                }
+
+            analysis["file_path"] = file_path
+            analysis["original_code"] = code_content
+            analysis["original_pylint_score"] = pylint_result["score"]
+            print(f"   ✅ Analysis complete for {file_path}")
+            return analysis
+
+        except BudgetExceededError:
+            raise
+        except Exception as e:
+            print(f"   ❌ Error analyzing {file_path}: {str(e)}")
+            log_experiment(
+                agent_name="Auditor_Agent",
+                model_used=self.model_name,
+                action=ActionType.ANALYSIS,
+                details={
+                    "file_analyzed": file_path,
+                    "input_prompt": f"Analysis request for {file_path}",
+                    "output_response": f"Error: {str(e)}",
+                    "error": str(e),
+                },
+                status="FAILURE",
+            )
+            return None
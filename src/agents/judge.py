@@ -1,12 +1,26 @@
+import contextvars
 import json
 import os
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from src.prompts.judge_prompt import JUDGE_SYSTEM_PROMPT
 from src.tools.file_tools import read_file
-from src.tools.analysis_tools import run_pylint, run_pytest
+from src.tools.analysis_tools import run_pylint, run_pytest, find_tests_for_file
 from src.utils.logger import log_experiment, ActionType
-from src.utils.model_utils import get_model, call_with_retry, MOCK_MODE
+from src.utils.model_utils import get_model, call_with_retry, get_last_usage, MOCK_MODE
+from src.utils.prompt_budget import PromptBudget, drop_passing_test_lines
+from src.utils.tracing import stage
+from src.utils.usage import BudgetExceededError
+
+# "off": always ask the model; "conclusive": decide clear-cut cases locally and
+# ask the model only when the evidence is mixed; "always": never ask the model
+JUDGE_LOCAL_POLICY = os.getenv("JUDGE_LOCAL_POLICY", "conclusive").lower()
+
+# Shared deadline for the pylint, pytest and execution checks of one evaluation
+JUDGE_CHECK_DEADLINE = float(os.getenv("JUDGE_CHECK_DEADLINE", "120"))
 
 
 class JudgeAgent:
@@ -18,44 +32,62 @@ class JudgeAgent:
         try:
             fixed_code = read_file(file_path)
 
-            # 1. RUN TOOLS (Style & Tests)
-            pylint_result = run_pylint(file_path)
-            pytest_result = run_pytest(target_dir)
-
-            # 2. NEW: RUN EXECUTION CHECK (Does it actually work?)
-            # We try to run the file directly: python3 file.py
-            full_path = (
-                os.path.join(target_dir, file_path)
-                if not os.path.isabs(file_path)
-                else file_path
+            # 1-2. RUN TOOLS (Style, Tests & Execution) concurrently
+            pylint_result, pytest_result, exit_code, exec_out = self._run_checks(
+                file_path, target_dir
             )
-            try:
-                # 3-second timeout for infinite loops
-                exec_result = subprocess.run(
-                    [sys.executable, full_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=3,
-                    cwd=target_dir,
-                )
-                exit_code = exec_result.returncode
-                exec_out = exec_result.stdout + exec_result.stderr
-            except subprocess.TimeoutExpired:
-                exit_code = 124  # Timeout error code
-                exec_out = "Execution timed out (Possible infinite loop)"
-            except Exception as e:
-                exit_code = 1
-                exec_out = str(e)
-
-            if MOCK_MODE:
+
+            if MOCK_MODE or JUDGE_LOCAL_POLICY == "always":
                 verdict = self._build_local_verdict(
                     original_score, pylint_result, pytest_result, exit_code
                 )
                 return self._finalize_verdict(
-                    verdict, file_path, pytest_result, pylint_result
+                    verdict, file_path, pytest_result, pylint_result, "local"
                 )
 
+            # 3. SHORT-CIRCUIT CLEAR-CUT CASES
+            if JUDGE_LOCAL_POLICY == "conclusive":
+                verdict = self._conclusive_verdict(
+                    original_score, pylint_result, pytest_result, exit_code, exec_out
+                )
+                if verdict is not None:
+                    log_experiment(
+                        agent_name="Judge_Agent",
+                        model_used="local_policy",
+                        action=ActionType.DEBUG,
+                        details={
+                            "file_analyzed": file_path,
+                            "input_prompt": (
+                                f"exit_code={exit_code} "
+                                f"tests_passed={pytest_result.get('passed', False)} "
+                                f"pylint={pylint_result.get('score', 0.0)} "
+                                f"original={original_score}"
+                            ),
+                            "output_response": json.dumps(verdict),
+                            "exit_code": exit_code,
+                            "decided_by": "local",
+                        },
+                        status="SUCCESS",
+                    )
+                    return self._finalize_verdict(
+                        verdict, file_path, pytest_result, pylint_result, "local"
+                    )
+
             # 4. CONSTRUCT PROMPT WITH EXECUTION DATA
+            # Failing tests matter most, then the execution trace, then pylint details
+            budget = PromptBudget()
+            budget.reserve(JUDGE_SYSTEM_PROMPT, fixed_code)
+            budget.section(
+                "pytest",
+                drop_passing_test_lines(pytest_result["output"]),
+                priority=3,
+                cap=1500,
+                keep="both",
+            )
+            budget.section("exec", exec_out, priority=2, cap=1000, keep="tail")
+            budget.section("pylint", pylint_result["output"], priority=1, cap=1000)
+            sections = budget.allocate()
+
             user_prompt = f"""{JUDGE_SYSTEM_PROMPT}
 
             Evaluate the fixed Python code.
@@ -64,15 +96,15 @@ class JudgeAgent:
 
             EXECUTION STATUS: {'✅ SUCCESS' if exit_code == 0 else '❌ FAILED'} (Exit Code: {exit_code})
             EXECUTION OUTPUT:
-            {exec_out[:3000]}
+            {sections['exec']}
 
             ORIGINAL PYLINT SCORE: {original_score}/10
             NEW PYLINT SCORE: {pylint_result['score']}/10
             PYLINT OUTPUT:
-            {pylint_result['output'][:3000]}
+            {sections['pylint']}
 
             PYTEST RESULTS:
-            {pytest_result['output'][:3000]}
+            {sections['pytest']}
 
             FIXED CODE:
             ```python
@@ -82,7 +114,7 @@ class JudgeAgent:
             Provide your verdict as a JSON object with 'verdict' (PASS/RETRY) and 'feedback'.
             """
 
-            response_text = call_with_retry(self.model, user_prompt)
+            response_text = call_with_retry(self.model, user_prompt, agent="Judge_Agent")
 
             # Log the attempt
             log_experiment(
@@ -94,11 +126,14 @@ class JudgeAgent:
                     "input_prompt": user_prompt[:],
                     "output_response": response_text[:],
                     "exit_code": exit_code,
+                    "decided_by": "llm",
+                    "usage": get_last_usage(),
                 },
                 status="SUCCESS",
             )
 
             # 5. PARSE RESPONSE
+            decided_by = "llm"
             try:
                 clean_response = (
                     response_text.replace("```json", "").replace("```", "").strip()
@@ -109,15 +144,19 @@ class JudgeAgent:
                     verdict = self._build_local_verdict(
                         original_score, pylint_result, pytest_result, exit_code
                     )
+                    decided_by = "local_fallback"
             except json.JSONDecodeError:
                 verdict = self._build_local_verdict(
                     original_score, pylint_result, pytest_result, exit_code
                 )
+                decided_by = "local_fallback"
 
             return self._finalize_verdict(
-                verdict, file_path, pytest_result, pylint_result
+                verdict, file_path, pytest_result, pylint_result, decided_by
             )
 
+        except BudgetExceededError:
+            raise
         except Exception as e:
             print(f"   ❌ Judge error: {str(e)}")
             return {
@@ -127,6 +166,90 @@ class JudgeAgent:
                 "feedback": f"Judge crash: {e}",
             }
 
+    def _run_checks(self, file_path: str, target_dir: str):
+        """
+        Run pylint, the targeted tests and the execution check in parallel.
+
+        All three share one deadline. If the script fails with a syntax error
+        the test run is cancelled, since its result can no longer change the
+        verdict. Pytest stays on the calling thread, which owns the warm
+        pytest worker.
+        """
+        deadline = time.monotonic() + JUDGE_CHECK_DEADLINE
+        cancel = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="judge-check")
+        try:
+            # Each check runs in a copy of this context, so its spans keep the file tags
+            exec_future = pool.submit(
+                contextvars.copy_context().run,
+                self._run_exec_check, file_path, target_dir, deadline, cancel
+            )
+            # Bounded by the deadline: behind a stuck in-process run (which keeps
+            # the pylint lock) this lint falls back to a killable subprocess, and
+            # once the run has been stuck for PYLINT_LOCK_TIMEOUT later lints skip the wait
+            pylint_future = pool.submit(
+                contextvars.copy_context().run,
+                run_pylint, file_path, max(0.1, deadline - time.monotonic())
+            )
+
+            # Only the tests tied to this file; the full suite runs once at the end
+            pytest_result = run_pytest(
+                target_dir,
+                test_files=find_tests_for_file(file_path, target_dir),
+                changed_files=[file_path],
+                timeout=max(0.0, deadline - time.monotonic()),
+                cancel_event=cancel,
+            )
+            if pytest_result.get("cancelled"):
+                pytest_result["output"] = "Tests skipped: the file does not compile."
+
+            exit_code, exec_out = exec_future.result()
+            try:
+                pylint_result = pylint_future.result(
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except FutureTimeoutError:
+                pylint_result = {
+                    "score": 0.0,
+                    "output": f"pylint did not finish within {JUDGE_CHECK_DEADLINE} seconds",
+                }
+        finally:
+            pool.shutdown(wait=False)
+
+        return pylint_result, pytest_result, exit_code, exec_out
+
+    @stage("exec")
+    def _run_exec_check(
+        self, file_path: str, target_dir: str, deadline: float, cancel: threading.Event
+    ):
+        """Run the file directly (python3 file.py); returns (exit_code, output)."""
+        full_path = (
+            os.path.join(target_dir, file_path)
+            if not os.path.isabs(file_path)
+            else file_path
+        )
+        try:
+            # 3-second timeout for infinite loops
+            exec_result = subprocess.run(
+                [sys.executable, full_path],
+                capture_output=True,
+                text=True,
+                timeout=max(0.1, min(3, deadline - time.monotonic())),
+                cwd=target_dir,
+            )
+            exit_code = exec_result.returncode
+            exec_out = exec_result.stdout + exec_result.stderr
+        except subprocess.TimeoutExpired:
+            exit_code = 124  # Timeout error code
+            exec_out = "Execution timed out (Possible infinite loop)"
+        except Exception as e:
+            exit_code = 1
+            exec_out = str(e)
+
+        if exit_code != 0 and "SyntaxError" in exec_out:
+            cancel.set()
+        return exit_code, exec_out
+
     def _build_local_verdict(
         self,
         original_score: float,
@@ -162,9 +285,51 @@ class JudgeAgent:
 
         return {"verdict": "RETRY", "feedback": " ".join(feedback_items)}
 
-    def _finalize_verdict(self, verdict, file_path, pytest_result, pylint_result):
+    def _conclusive_verdict(
+        self,
+        original_score: float,
+        pylint_result: dict,
+        pytest_result: dict,
+        exit_code: int,
+        exec_out: str,
+    ):
+        """
+        Verdict for cases the tool results settle on their own, else None.
+
+        PASS when tests pass, the script runs and pylint did not get worse;
+        RETRY on a syntax error, or when the script crashes and tests fail.
+        """
+        pylint_score = float(pylint_result.get("score", 0.0))
+        tests_passed = bool(pytest_result.get("passed", False))
+
+        if tests_passed and exit_code == 0 and pylint_score >= original_score:
+            return {
+                "verdict": "PASS",
+                "feedback": "Tests passed, execution is stable and the pylint score did not regress.",
+            }
+
+        pylint_output = pylint_result.get("output", "")
+        if "syntax-error" in pylint_output or "E0001" in pylint_output or (
+            exit_code != 0 and "SyntaxError" in (exec_out or "")
+        ):
+            return {
+                "verdict": "RETRY",
+                "feedback": "The file has a syntax error; fix it before anything else.",
+            }
+
+        if exit_code != 0 and not tests_passed:
+            return self._build_local_verdict(
+                original_score, pylint_result, pytest_result, exit_code
+            )
+
+        return None
+
+    def _finalize_verdict(
+        self, verdict, file_path, pytest_result, pylint_result, decided_by="llm"
+    ):
         """Helper to attach metadata to the verdict before returning"""
         verdict["file_path"] = file_path
+        verdict["decided_by"] = decided_by
         verdict["pytest_output"] = pytest_result.get("output", "")
         verdict["pylint_output"] = pylint_result.get("output", "")
         verdict["actual_tests_passed"] = pytest_result.get("passed", False)
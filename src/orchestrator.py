@@ -1,18 +1,50 @@
 import os
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.agents.auditor import AuditorAgent
 from src.agents.fixer import FixerAgent
 from src.agents.judge import JudgeAgent
-from src.tools.file_tools import set_sandbox
+from src.tools.file_tools import set_sandbox, iter_python_files
+from src.tools.analysis_tools import run_pytest
 from src.utils.logger import log_experiment, ActionType
+from src.utils.manifest import Manifest, file_hash
+from src.utils.checkpoint import Checkpoint
+from src.utils.prompt_budget import drop_passing_test_lines
+from src.utils.tracing import stage, trace_context
+from src.utils.usage import BudgetExceededError, get_usage_tracker
+
+# End-of-stream marker put on the analysis queue by the auditor thread
+_AUDIT_DONE = object()
 
 
 class Orchestrator:
-    def __init__(self, target_dir: str, api_key: str):
+    def __init__(
+        self,
+        target_dir: str,
+        api_key: str,
+        workers: int = 1,
+        incremental: bool = True,
+        resume: bool = False,
+    ):
         self.target_dir = os.path.abspath(target_dir)
         self.api_key = api_key
         set_sandbox(self.target_dir)
         self.max_iterations = 5
+        # Files are independent, so their fix/judge loops can run side by side
+        self.workers = max(1, workers)
+        # Incremental runs skip files that passed last time and are unchanged since
+        self.incremental = incremental
+        self.manifest = (
+            Manifest.load(self.target_dir) if incremental else Manifest(self.target_dir)
+        )
+        # Progress is journaled as it happens; resume replays it instead of redoing LLM work
+        self.resume = resume
+        self.checkpoint = Checkpoint(self.target_dir)
+        # Token and cost accounting; the budget is per run
+        self.usage = get_usage_tracker()
 
     def run(self) -> dict:
         if self.target_dir not in sys.path:
@@ -33,111 +65,318 @@ class Orchestrator:
         fixer = FixerAgent(self.api_key)
         judge = JudgeAgent(self.api_key)
 
-        print("🔍 Running Audit Phase...")
-        audit_result = auditor.analyze(self.target_dir)
-        analyses = audit_result.get("analyses", [])
+        if self.resume:
+            self.checkpoint.load()
+        else:
+            self.checkpoint.reset()
+        self.usage.reset()
 
-        if not analyses:
-            print("⚠️ No analyses returned. Check AuditorAgent.")
-            return {"mission_complete": True, "completed_files": [], "total_files": 0}
+        print("🔍 Running Audit Phase...")
+        # Stream analyses: the auditor runs in its own thread and each analysis is
+        # fixed as soon as it arrives. The bounded queue and in-flight semaphore
+        # give backpressure, so the auditor never runs far ahead of the fixers.
+        analysis_queue = queue.Queue(maxsize=self.workers * 2)
+        audit_errors = []
+        python_files = []
+        skipped_files = []
+        resumed_results = []
+        resumed_analyses = []
 
-        completed_files = []
+        def files_to_audit():
+            # Discovery is lazy too: the first file is audited before the scan ends
+            for file_path in iter_python_files(self.target_dir):
+                python_files.append(file_path)
+                if self.incremental and self.manifest.is_up_to_date(file_path):
+                    skipped_files.append(file_path)
+                    continue
+                key = self.checkpoint.key(file_path)
+                if key in self.checkpoint.completed:
+                    analysis = self.checkpoint.analyses.get(key, {"file_path": file_path})
+                    resumed_results.append((analysis, self.checkpoint.completed[key]))
+                elif key in self.checkpoint.analyses:
+                    resumed_analyses.append(file_path)
+                    analysis_queue.put(self.checkpoint.analyses[key])
+                else:
+                    yield file_path
 
-        for analysis in analyses:
-            file_path = analysis.get("file_path", "unknown")
-            original_score = analysis.get("original_pylint_score", 0)
-            iteration = 0
-            error_logs = None
-            write_failures = 0
+        def produce_analyses():
+            try:
+                analyses = auditor.iter_analyses(self.target_dir, files_to_audit())
+                while True:
+                    with stage("audit") as span:
+                        analysis = next(analyses, None)
+                        if analysis is not None:
+                            span["file"] = analysis.get("file_path")
+                    if analysis is None:
+                        break
+                    # Hashed like staging hashes the source (raw bytes), before any fix is written
+                    analysis["input_hash"] = file_hash(
+                        self._full_path(analysis.get("file_path", "unknown"))
+                    )
+                    self.checkpoint.record_analysis(analysis)
+                    analysis_queue.put(analysis)
+            except BudgetExceededError:
+                # Files not audited yet are left for a resumed run
+                pass
+            except Exception as e:
+                audit_errors.append(e)
+            finally:
+                analysis_queue.put(_AUDIT_DONE)
 
-            # Ensure we are working with the absolute path
-            full_path = (
-                os.path.join(self.target_dir, file_path)
-                if not os.path.isabs(file_path)
-                else file_path
-            )
+        producer = threading.Thread(target=produce_analyses, name="auditor", daemon=True)
+        producer.start()
 
-            print(f"\n📁 Processing: {file_path} (Score: {original_score})")
+        if self.workers > 1:
+            print(f"⚡ Processing files with {self.workers} workers")
 
-            while iteration < self.max_iterations:
-                iteration += 1
-                print(f"   🔄 Iteration {iteration}/{self.max_iterations}")
+        futures = []
+        in_flight = threading.BoundedSemaphore(self.workers)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="worker") as pool:
+            while True:
+                analysis = analysis_queue.get()
+                if analysis is _AUDIT_DONE:
+                    break
+                if self.usage.exhausted():
+                    # Out of budget: drain the queue without starting new files
+                    continue
+                in_flight.acquire()
+                future = pool.submit(self._process_and_checkpoint, analysis, fixer, judge)
+                future.add_done_callback(lambda _: in_flight.release())
+                futures.append((analysis, future))
+        producer.join()
 
-                analysis["current_iteration"] = iteration
-                fix_result = fixer.fix(analysis, error_logs)
+        if audit_errors:
+            raise audit_errors[0]
 
-                if not fix_result.get("file_written", False):
-                    print(f"   ⚠️ Fix not written: {fix_result.get('error')}")
-                    write_failures += 1
-                    error_logs = (
-                        f"Previous attempt failed to write file: {fix_result.get('error')}"
-                    )
-                    if write_failures >= 2:
-                        print("   ❌ Aborting file due to repeated write failures.")
-                        completed_files.append(
-                            {
-                                "file": file_path,
-                                "status": "RETRY",
-                                "iterations": iteration,
-                                "final_verdict": {
-                                    "verdict": "RETRY",
-                                    "feedback": "Repeated write failures from Fixer.",
-                                },
-                            }
-                        )
-                        break
-                    continue
-                write_failures = 0
+        if skipped_files:
+            print(f"⏭️  Skipped {len(skipped_files)} unchanged files that already passed")
+        if self.resume:
+            print(
+                f"↩️  Resumed: {len(resumed_results)} files already finished, "
+                f"{len(resumed_analyses)} already audited"
+            )
 
-                # EVALUATION PHASE
-                print("   ⚖️  Judging new code...")
-                verdict = judge.evaluate(full_path, original_score, self.target_dir)
-                v_status = verdict.get("verdict", "UNKNOWN").upper()
+        if not futures and not resumed_results and not self.usage.exhausted():
+            self.checkpoint.remove()
+            if skipped_files:
+                print("✅ Nothing changed since the last run.")
+            else:
+                print("⚠️ No analyses returned. Check AuditorAgent.")
+            return {
+                "mission_complete": True,
+                "completed_files": [],
+                "total_files": len(skipped_files),
+                "skipped_files": skipped_files,
+                "usage": self.usage.summary(),
+            }
 
-                if v_status == "PASS":
-                    print(f"   ✅ PASS (Success)")
-                    final_score = verdict.get("actual_new_score")
-                    print(f"FINAL SCORE: {final_score}")
-                    completed_files.append(
+        # Results are reported in file order, whatever finishes first
+        entries = list(resumed_results)
+        for analysis, future in futures:
+            try:
+                entries.append((analysis, future.result()))
+            except BudgetExceededError:
+                pass
+            except Exception as e:
+                # One crashed file must not cost the manifest entries of all the others
+                file_path = analysis.get("file_path", "unknown")
+                print(f"   ❌ Processing {file_path} crashed: {e}")
+                entries.append(
+                    (
+                        analysis,
                         {
                             "file": file_path,
-                            "status": "PASS",
-                            "iterations": iteration,
-                            "final_verdict": verdict,
-                        }
+                            "status": "RETRY",
+                            "iterations": 0,
+                            "error": str(e),
+                            "final_verdict": {
+                                "verdict": "RETRY",
+                                "feedback": f"Processing crashed: {e}",
+                            },
+                            "usage": self.usage.file_usage(file_path),
+                        },
                     )
-                    break
+                )
+        order = {file_path: index for index, file_path in enumerate(python_files)}
+        entries.sort(key=lambda entry: order.get(entry[0].get("file_path"), len(order)))
+        completed_files = []
+        for analysis, file_result in entries:
+            self._record_result(analysis, file_result)
+            completed_files.append(file_result)
+        self.manifest.save()
 
-                elif v_status == "RETRY":
-                    feedback = verdict.get("feedback", "No feedback")
-                    print(f"   🔄 RETRY NEEDED: {feedback}")
-                    error_logs = (
-                        f"Judge Feedback: {feedback}\n"
-                        f"Test Output: {verdict.get('pytest_output', '')[:3000]}"
-                    )
-                    # Update analysis so Fixer sees the history
-                    analysis["previous_fix"] = fix_result
+        if self.usage.exhausted():
+            # The checkpoint stays, so --resume picks up where the budget ran out
+            self.checkpoint.close()
+            finished = {analysis.get("file_path") for analysis, _ in entries}
+            unfinished_files = [
+                file_path
+                for file_path in python_files
+                if file_path not in finished and file_path not in skipped_files
+            ]
+            print(f"\n💸 LLM budget exhausted; {len(unfinished_files)} files left unfinished")
+            log_experiment(
+                agent_name="Orchestrator",
+                model_used="system",
+                action=ActionType.DEBUG,
+                details={
+                    "input_prompt": "Budget check",
+                    "output_response": f"Budget exhausted, {len(unfinished_files)} files unfinished",
+                    "usage": self.usage.summary()["totals"],
+                },
+                status="FAILURE",
+            )
+            return {
+                "mission_complete": False,
+                "budget_exhausted": True,
+                "completed_files": completed_files,
+                "unfinished_files": unfinished_files,
+                "total_files": len(python_files),
+                "skipped_files": skipped_files,
+                "usage": self.usage.summary(),
+            }
 
-                else:
-                    print(f"   ❓ Unknown Verdict '{v_status}'. Retrying...")
-                    error_logs = f"Judge returned unclear verdict: {v_status}. Please fix code validity."
+        # Every file is done and recorded in the manifest; nothing is left to resume
+        self.checkpoint.remove()
 
-            else:
-                print(f"   🛑 Max iterations reached for {file_path}")
-                completed_files.append(
-                    {
+        # The Judge only ran each file's own tests; run the full suite once as the final gate
+        print("\n🧪 Running full test suite (final gate)...")
+        final_tests = run_pytest(self.target_dir)
+
+        return {
+            "mission_complete": True,
+            "completed_files": completed_files,
+            "total_files": len(completed_files) + len(skipped_files),
+            "skipped_files": skipped_files,
+            "final_tests": final_tests,
+            "usage": self.usage.summary(),
+        }
+
+    def _full_path(self, file_path: str) -> str:
+        return (
+            os.path.join(self.target_dir, file_path)
+            if not os.path.isabs(file_path)
+            else file_path
+        )
+
+    def _record_result(self, analysis: dict, file_result: dict) -> None:
+        verdict = file_result.get("final_verdict", {})
+        self.manifest.record(
+            self._full_path(analysis.get("file_path", "unknown")),
+            input_hash=analysis.get("input_hash"),
+            verdict=file_result.get("status", "RETRY"),
+            original_score=analysis.get("original_pylint_score", 0),
+            final_score=verdict.get("actual_new_score"),
+            iterations=file_result.get("iterations", 0),
+        )
+
+    def _process_and_checkpoint(
+        self, analysis: dict, fixer: FixerAgent, judge: JudgeAgent
+    ) -> dict:
+        file_path = analysis.get("file_path", "unknown")
+        start = time.perf_counter()
+        with trace_context(file=file_path), stage("file"):
+            file_result = self._process_file(analysis, fixer, judge)
+        file_result["elapsed"] = time.perf_counter() - start
+        file_result["usage"] = self.usage.file_usage(file_path)
+        self.checkpoint.record_completed(file_path, file_result)
+        return file_result
+
+    def _process_file(self, analysis: dict, fixer: FixerAgent, judge: JudgeAgent) -> dict:
+        """Run the fix/judge loop for one audited file and return its report entry."""
+        file_path = analysis.get("file_path", "unknown")
+        original_score = analysis.get("original_pylint_score", 0)
+        iteration = 0
+        error_logs = None
+        write_failures = 0
+
+        # A resumed file continues after its last judged iteration
+        state = self.checkpoint.iterations.get(self.checkpoint.key(file_path))
+        if state:
+            iteration = state["iteration"]
+            error_logs = state["error_logs"]
+            if state.get("previous_fix"):
+                analysis["previous_fix"] = state["previous_fix"]
+            print(f"   ↩️  Resuming {file_path} after iteration {iteration}")
+
+        # Ensure we are working with the absolute path
+        full_path = (
+            os.path.join(self.target_dir, file_path)
+            if not os.path.isabs(file_path)
+            else file_path
+        )
+
+        print(f"\n📁 Processing: {file_path} (Score: {original_score})")
+
+        while iteration < self.max_iterations:
+            # Stop between iterations once the budget is spent; the checkpoint keeps the progress
+            self.usage.check_budget()
+            iteration += 1
+            print(f"   🔄 Iteration {iteration}/{self.max_iterations}")
+
+            analysis["current_iteration"] = iteration
+            with trace_context(iteration=iteration), stage("fix"):
+                fix_result = fixer.fix(analysis, error_logs)
+
+            if not fix_result.get("file_written", False):
+                print(f"   ⚠️ Fix not written: {fix_result.get('error')}")
+                write_failures += 1
+                error_logs = (
+                    f"Previous attempt failed to write file: {fix_result.get('error')}"
+                )
+                if write_failures >= 2:
+                    print("   ❌ Aborting file due to repeated write failures.")
+                    return {
                         "file": file_path,
                         "status": "RETRY",
                         "iterations": iteration,
                         "final_verdict": {
                             "verdict": "RETRY",
-                            "feedback": "Max iterations reached.",
+                            "feedback": "Repeated write failures from Fixer.",
                         },
                     }
+                continue
+            write_failures = 0
+
+            # EVALUATION PHASE
+            print("   ⚖️  Judging new code...")
+            with trace_context(iteration=iteration), stage("judge"):
+                verdict = judge.evaluate(full_path, original_score, self.target_dir)
+            v_status = verdict.get("verdict", "UNKNOWN").upper()
+
+            if v_status == "PASS":
+                print(f"   ✅ PASS (Success)")
+                final_score = verdict.get("actual_new_score")
+                print(f"FINAL SCORE: {final_score}")
+                return {
+                    "file": file_path,
+                    "status": "PASS",
+                    "iterations": iteration,
+                    "final_verdict": verdict,
+                }
+
+            elif v_status == "RETRY":
+                feedback = verdict.get("feedback", "No feedback")
+                print(f"   🔄 RETRY NEEDED: {feedback}")
+                error_logs = (
+                    f"Judge Feedback: {feedback}\n"
+                    f"Test Output: {drop_passing_test_lines(verdict.get('pytest_output', ''))}"
                 )
+                # Update analysis so Fixer sees the history
+                analysis["previous_fix"] = fix_result
+                self.checkpoint.record_iteration(file_path, iteration, error_logs, fix_result)
+
+            else:
+                print(f"   ❓ Unknown Verdict '{v_status}'. Retrying...")
+                error_logs = f"Judge returned unclear verdict: {v_status}. Please fix code validity."
 
+        print(f"   🛑 Max iterations reached for {file_path}")
         return {
-            "mission_complete": True,
-            "completed_files": completed_files,
-            "total_files": len(analyses),
+            "file": file_path,
+            "status": "RETRY",
+            "iterations": iteration,
+            "final_verdict": {
+                "verdict": "RETRY",
+                "feedback": "Max iterations reached.",
+            },
         }
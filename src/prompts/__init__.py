@@ -1,9 +1,11 @@
-from src.prompts.auditor_prompt import AUDITOR_SYSTEM_PROMPT
-from src.prompts.fixer_prompt import FIXER_SYSTEM_PROMPT
+from src.prompts.auditor_prompt import AUDITOR_SYSTEM_PROMPT, AUDITOR_BATCH_PROMPT
+from src.prompts.fixer_prompt import FIXER_SYSTEM_PROMPT, FIXER_PATCH_PROMPT
 from src.prompts.judge_prompt import JUDGE_SYSTEM_PROMPT
 
 __all__ = [
     "AUDITOR_SYSTEM_PROMPT",
+    "AUDITOR_BATCH_PROMPT",
     "FIXER_SYSTEM_PROMPT",
+    "FIXER_PATCH_PROMPT",
     "JUDGE_SYSTEM_PROMPT"
 ]
@@ -35,3 +35,23 @@ You must respond with a JSON object containing your analysis:
 }
 
 Be thorough but prioritize high-severity issues. Focus on issues that will improve the pylint score and make tests pass."""
+
+
+AUDITOR_BATCH_PROMPT = """You will receive SEVERAL Python files at once. Analyze each file independently, exactly as you would a single file.
+
+OUTPUT FORMAT:
+Respond with ONE JSON object containing one analysis per file, in the same order as the files:
+
+{
+    "analyses": [
+        {
+            "file_path": "<the exact FILE PATH given for this file>",
+            "overall_assessment": "...",
+            "pylint_score": <current pylint score>,
+            "issues": [...],
+            "refactoring_plan": [...]
+        }
+    ]
+}
+
+Every file must appear exactly once, and "file_path" must be copied verbatim so each analysis can be matched to its file."""
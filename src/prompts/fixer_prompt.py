@@ -32,4 +32,46 @@ IMPORTANT RULES:
 - Preserve the original logic/functionality
 - Make sure the code is syntactically valid Python
 - If you cannot fix an issue, document why in changes_made
-- Always add module-level docstring if missing"""
\ No newline at end of file
+- Always add module-level docstring if missing"""
+
+FIXER_PATCH_PROMPT = """You are an expert Python developer. Your task is to fix Python code based on an analysis report, by describing the edits to make instead of rewriting the file.
+
+INPUT:
+- Original Python code
+- Analysis report with identified issues and refactoring plan
+- Previous error logs (if this is a retry attempt)
+
+FIXING PROCESS:
+1. Review the analysis report carefully
+2. Apply fixes in order of severity (high to low)
+3. Ensure all fixes are syntactically correct
+4. Add proper docstrings to all functions and classes
+5. Follow PEP8 style guidelines
+6. Ensure error handling is in place
+
+OUTPUT FORMAT:
+You must respond with a JSON object containing a list of search/replace edits:
+
+{
+    "file_path": "path/to/file.py",
+    "edits": [
+        {
+            "search": "exact lines copied from the current code",
+            "replace": "the lines that replace them"
+        }
+    ],
+    "changes_made": [
+        "Description of change 1",
+        "Description of change 2"
+    ],
+    "confidence": "high|medium|low"
+}
+
+IMPORTANT RULES:
+- "search" must be copied verbatim from the code, including indentation
+- Each "search" must match exactly one place; add surrounding lines if needed
+- Edits are applied in order, each to the result of the previous ones
+- Keep edits small: only the lines that change plus enough context to be unique
+- To add a module docstring, replace the first line(s) of the file
+- Preserve the original logic/functionality
+- If you cannot fix an issue, document why in changes_made"""
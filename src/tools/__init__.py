@@ -1,11 +1,27 @@
-from src.tools.file_tools import read_file, write_file, list_python_files
-from src.tools.analysis_tools import run_pylint, run_pytest, get_pylint_score
+from src.tools.file_tools import read_file, write_file, list_python_files, iter_python_files
+from src.tools.analysis_tools import (
+    run_pylint,
+    run_pylint_batch,
+    run_pytest,
+    find_tests_for_file,
+    get_pylint_score,
+    get_pylint_stats,
+)
+from src.tools.patch_tools import apply_edits
+from src.tools.ast_fixer import apply_ast_rules, select_rules
 
 __all__ = [
     "read_file",
     "write_file", 
     "list_python_files",
+    "iter_python_files",
     "run_pylint",
+    "run_pylint_batch",
     "run_pytest",
-    "get_pylint_score"
+    "find_tests_for_file",
+    "get_pylint_score",
+    "get_pylint_stats",
+    "apply_edits",
+    "apply_ast_rules",
+    "select_rules"
 ]
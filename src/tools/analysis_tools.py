@@ -1,26 +1,387 @@
+import ast
+import atexit
+import functools
+import hashlib
+import io
+import os
 import subprocess
 import re
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from src.tools.file_tools import walk_files
+from src.tools.pytest_worker import PytestWorker
+from src.utils.disk_cache import DiskCache
+from src.utils.tracing import stage
 
+# "inprocess" keeps pylint/astroid imported and warm across calls,
+# "subprocess" spawns `python -m pylint` for every file.
+PYLINT_ENGINE = os.getenv("PYLINT_ENGINE", "inprocess").lower()
 
-def run_pylint(file_path: str) -> dict:
+# Results are cached on disk, keyed by file content + pylint version + rcfile
+PYLINT_CACHE = os.getenv("PYLINT_CACHE", "true").lower() == "true"
+PYLINT_CACHE_DIR = os.getenv("PYLINT_CACHE_DIR", os.path.join(".cache", "pylint"))
+PYLINT_CACHE_SIZE = int(os.getenv("PYLINT_CACHE_SIZE", "2000"))
+
+# Worker processes for batch runs (0 = one per CPU); small batches stay single-process
+PYLINT_JOBS = int(os.getenv("PYLINT_JOBS", "0"))
+_PARALLEL_MIN_FILES = 16
+
+# Pylint and astroid keep global state, so in-process runs are serialized.
+# A run that holds the lock for more than PYLINT_LOCK_TIMEOUT seconds is taken
+# to be stuck: the in-process engine is then marked unhealthy and every later
+# lint goes straight to a subprocess instead of queueing behind it.
+PYLINT_LOCK_TIMEOUT = float(os.getenv("PYLINT_LOCK_TIMEOUT", "30"))
+_PYLINT_SUBPROCESS_TIMEOUT = 60
+_pylint_lock = threading.Lock()
+_pylint_lock_held_since = None
+_inprocess_unhealthy = threading.Event()
+_pylint_stats = {
+    "runs": 0,
+    "seconds": 0.0,
+    "inprocess": 0,
+    "subprocess": 0,
+    "batches": 0,
+}
+_stats_lock = threading.Lock()
+_pylint_cache = DiskCache(PYLINT_CACHE_DIR, PYLINT_CACHE_SIZE)
+
+# "worker" runs per-file test selections in a warm, long-lived pytest process,
+# "subprocess" spawns `python -m pytest` every time. Full-suite runs always use a subprocess.
+PYTEST_ENGINE = os.getenv("PYTEST_ENGINE", "worker").lower()
+# One worker per calling thread, so concurrent Judges do not queue behind each other
+_pytest_workers = threading.local()
+
+# Config files pylint picks up from the working directory
+_PYLINT_RCFILES = ("pylintrc", ".pylintrc", "pyproject.toml", "setup.cfg", "tox.ini")
+
+
+@stage("pylint")
+def run_pylint(file_path: str, timeout: float = None) -> dict:
+    """
+    Lint one file; returns {score, output, success, duration}.
+
+    timeout bounds the whole call: the wait for the in-process engine and,
+    after a fallback, the pylint subprocess, which is killed when it expires.
+    """
+    start = time.perf_counter()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    cache_key = _pylint_cache_key(file_path) if PYLINT_CACHE else None
+    if cache_key:
+        cached = _pylint_cache.get(cache_key)
+        if cached is not None:
+            cached["duration"] = time.perf_counter() - start
+            cached["cached"] = True
+            return cached
+
+    result = None
+    engine = "subprocess"
+    if PYLINT_ENGINE == "inprocess":
+        lock_timeout = PYLINT_LOCK_TIMEOUT if timeout is None else min(timeout, PYLINT_LOCK_TIMEOUT)
+        result = _run_pylint_inprocess(file_path, lock_timeout)
+        engine = "inprocess"
+    if result is None:
+        subprocess_timeout = _PYLINT_SUBPROCESS_TIMEOUT
+        if deadline is not None:
+            subprocess_timeout = max(1.0, min(subprocess_timeout, deadline - time.monotonic()))
+        result = _run_pylint_subprocess(file_path, subprocess_timeout)
+        engine = "subprocess"
+
+    if cache_key and result["success"]:
+        _pylint_cache.put(cache_key, result)
+
+    result["duration"] = time.perf_counter() - start
+    with _stats_lock:
+        _pylint_stats["runs"] += 1
+        _pylint_stats["seconds"] += result["duration"]
+        _pylint_stats[engine] += 1
+    return result
+
+
+def _run_pylint_subprocess(file_path: str, timeout: float = _PYLINT_SUBPROCESS_TIMEOUT) -> dict:
     try:
         result = subprocess.run(
             [sys.executable, "-m", "pylint", file_path, "--output-format=text"],
             capture_output=True,
             text=True,
-            timeout=60,
+            timeout=timeout,
         )
         output = result.stdout + result.stderr
-        score_match = re.search(r"Your code has been rated at ([\d.-]+)/10", output)
-        score = float(score_match.group(1)) if score_match else 0.0
-        return {"score": score, "output": output, "success": True}
+        return {"score": _parse_pylint_score(output), "output": output, "success": True}
     except Exception as e:
         return {"score": 0.0, "output": str(e), "success": False}
 
 
-def run_pytest(target_dir: str = "fixedcodes") -> dict:
+def _run_pylint_inprocess(file_path: str, lock_timeout: float = PYLINT_LOCK_TIMEOUT):
+    """
+    Lint in this interpreter. Returns None when pylint cannot be imported
+    here, exits early or stays busy for lock_timeout seconds, so the caller
+    falls back to a subprocess run.
+    """
+    try:
+        from astroid import MANAGER
+        from pylint.lint import Run
+        from pylint.reporters.text import TextReporter
+    except ImportError:
+        return None
+
+    output = io.StringIO()
+    with _acquire_pylint_lock(lock_timeout) as acquired:
+        if not acquired:
+            return None
+        _evict_astroid_cache(file_path, MANAGER)
+        try:
+            Run([file_path], reporter=TextReporter(output), exit=False)
+        except SystemExit:
+            # Pylint exits on bad options/config even with exit=False; the output
+            # holds no report, and must not be scored or cached as one
+            return None
+        except Exception as e:
+            return {"score": 0.0, "output": str(e), "success": False}
+
+    text = output.getvalue()
+    return {"score": _parse_pylint_score(text), "output": text, "success": True}
+
+
+@contextmanager
+def _acquire_pylint_lock(timeout: float):
+    """Hold the in-process pylint lock if it frees up within timeout seconds; yields whether it did."""
+    global _pylint_lock_held_since
+    acquired = not _inprocess_unhealthy.is_set() and _pylint_lock.acquire(
+        timeout=max(0.0, timeout)
+    )
+    if not acquired:
+        held_since = _pylint_lock_held_since
+        if (
+            held_since is not None
+            and time.monotonic() - held_since >= PYLINT_LOCK_TIMEOUT
+            and not _inprocess_unhealthy.is_set()
+        ):
+            _inprocess_unhealthy.set()
+            print(
+                f"   ⚠️ In-process pylint busy for over {PYLINT_LOCK_TIMEOUT:.0f}s; "
+                "linting in subprocesses from now on"
+            )
+    else:
+        _pylint_lock_held_since = time.monotonic()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            _pylint_lock_held_since = None
+            _pylint_lock.release()
+
+
+def run_pylint_batch(file_paths: list, jobs: int = None) -> dict:
+    """
+    Lint many files with a single pylint run and split the results per file.
+
+    Returns {file_path: {score, output, success, duration}}, the same shape as
+    run_pylint. Cached files are not re-linted; files the batch cannot account
+    for fall back to run_pylint.
+    """
+    results = {}
+    pending = []
+    for file_path in file_paths:
+        cache_key = _pylint_cache_key(file_path) if PYLINT_CACHE else None
+        cached = _pylint_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            cached["duration"] = 0.0
+            cached["cached"] = True
+            results[file_path] = cached
+        else:
+            pending.append((file_path, cache_key))
+
+    if not pending:
+        return results
+
+    start = time.perf_counter()
+    batch_results = {}
+    if PYLINT_ENGINE == "inprocess" and len(pending) > 1:
+        if jobs is None:
+            jobs = PYLINT_JOBS if len(pending) >= _PARALLEL_MIN_FILES else 1
+        batch_results = _run_pylint_batch_inprocess(
+            [file_path for file_path, _ in pending], jobs
+        ) or {}
+    elapsed = time.perf_counter() - start
+
+    if batch_results:
+        with _stats_lock:
+            _pylint_stats["runs"] += len(batch_results)
+            _pylint_stats["seconds"] += elapsed
+            _pylint_stats["inprocess"] += len(batch_results)
+            _pylint_stats["batches"] += 1
+
+    for file_path, cache_key in pending:
+        result = batch_results.get(file_path)
+        if result is None:
+            results[file_path] = run_pylint(file_path)
+            continue
+        if cache_key:
+            _pylint_cache.put(cache_key, result)
+        result["duration"] = elapsed / len(batch_results)
+        results[file_path] = result
+
+    return results
+
+
+@stage("pylint")
+def _run_pylint_batch_inprocess(file_paths: list, jobs: int):
+    try:
+        from astroid import MANAGER
+        from pylint.lint import Run
+        from pylint.reporters.text import TextReporter
+    except ImportError:
+        return None
+
+    class _SplitTextReporter(TextReporter):
+        """Text reporter that keeps a separate output buffer per linted file."""
+
+        def __init__(self):
+            super().__init__(io.StringIO())
+            self.outputs = {}
+            self.modules = {}
+
+        def on_set_current_module(self, module, filepath):
+            super().on_set_current_module(module, filepath)
+            if filepath:
+                self.modules[os.path.abspath(filepath)] = module
+
+        def handle_message(self, msg):
+            self.out = self.outputs.setdefault(os.path.abspath(msg.abspath), io.StringIO())
+            super().handle_message(msg)
+
+        def _display(self, layout):
+            # The global score section is replaced by per-file scores below
+            pass
+
+    reporter = _SplitTextReporter()
+    with _acquire_pylint_lock(PYLINT_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            return None
+        for file_path in file_paths:
+            _evict_astroid_cache(file_path, MANAGER)
+        try:
+            # Cross-module checks would attribute messages to whichever file
+            # was linted last; single-file runs never emit them
+            run = Run(
+                [*file_paths, f"--jobs={jobs}", "--disable=duplicate-code,cyclic-import"],
+                reporter=reporter,
+                exit=False,
+            )
+        except SystemExit:
+            return None
+        except Exception:
+            return None
+
+    linter = run.linter
+    module_owners = {}
+    for abs_path, module in reporter.modules.items():
+        module_owners.setdefault(module, []).append(abs_path)
+
+    results = {}
+    for file_path in file_paths:
+        abs_path = os.path.abspath(file_path)
+        module = reporter.modules.get(abs_path)
+        module_stats = linter.stats.by_module.get(module) if module else None
+        if module_stats is None or len(module_owners.get(module, [])) > 1:
+            # Not linted, or two files share a module name and their stats merged
+            continue
+
+        output = reporter.outputs.get(abs_path, io.StringIO()).getvalue()
+        score = 0.0
+        if module_stats["statement"]:
+            try:
+                note = eval(linter.config.evaluation, {}, dict(module_stats))  # pylint: disable=eval-used
+                rating = f"Your code has been rated at {note:.2f}/10"
+                score = _parse_pylint_score(rating)
+                output += f"\n{'-' * len(rating)}\n{rating}\n\n"
+            except Exception:
+                score = 0.0
+        results[file_path] = {"score": score, "output": output, "success": True}
+
+    return results
+
+
+def _evict_astroid_cache(file_path: str, manager) -> None:
+    # astroid caches parsed modules by name; the Fixer rewrites files between
+    # runs, so drop every cached module from the linted file's directory tree
+    # while keeping stdlib/third-party ASTs warm.
+    root = os.path.dirname(os.path.abspath(file_path))
+    for name, module in list(manager.astroid_cache.items()):
+        module_file = getattr(module, "file", None)
+        if module_file and os.path.abspath(module_file).startswith(root + os.sep):
+            manager.astroid_cache.pop(name, None)
+
+
+def _parse_pylint_score(output: str) -> float:
+    score_match = re.search(r"Your code has been rated at ([\d.-]+)/10", output)
+    return float(score_match.group(1)) if score_match else 0.0
+
+
+def _pylint_cache_key(file_path: str):
+    try:
+        with open(file_path, "rb") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    digest = hashlib.sha256()
+    # The path is part of the key: module names in the messages depend on it
+    digest.update(os.path.abspath(file_path).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(content)
+    digest.update(b"\0")
+    digest.update(_pylint_environment_fingerprint().encode("utf-8"))
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def _pylint_environment_fingerprint() -> str:
+    try:
+        from importlib.metadata import version
+
+        pylint_version = version("pylint")
+    except Exception:
+        pylint_version = "unknown"
+
+    digest = hashlib.sha256(pylint_version.encode("utf-8"))
+    rcfiles = [os.getenv("PYLINTRC", "")] + list(_PYLINT_RCFILES)
+    for rcfile in rcfiles:
+        if rcfile and os.path.isfile(rcfile):
+            with open(rcfile, "rb") as f:
+                digest.update(rcfile.encode("utf-8"))
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def get_pylint_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_pylint_stats)
+    cache_stats = _pylint_cache.stats()
+    stats["cache_hits"] = cache_stats["hits"]
+    stats["cache_misses"] = cache_stats["misses"]
+    return stats
+
+
+@stage("pytest")
+def run_pytest(
+    target_dir: str = "fixedcodes",
+    test_files: list = None,
+    changed_files: list = None,
+    timeout: float = 120,
+    cancel_event: threading.Event = None,
+) -> dict:
+    """
+    Run pytest on target_dir, or only on test_files when given.
+
+    An empty test_files list means the caller found no tests for the file
+    under evaluation, which counts as passing. The warm worker re-imports every
+    module under target_dir, plus changed_files (rewritten files elsewhere).
+    Setting cancel_event stops the run early; it then fails with "cancelled": True.
+    """
     tests_root = Path(target_dir)
     if not tests_root.exists():
         return {
@@ -29,29 +390,162 @@ def run_pytest(target_dir: str = "fixedcodes") -> dict:
             "return_code": 0,
         }
 
-    test_files = list(tests_root.glob("test_*.py"))
-    if not test_files:
-        return {
-            "passed": True,
-            "output": f"No tests found under {target_dir}. Skipping pytest.",
-            "return_code": 0,
-        }
+    if test_files is not None:
+        if not test_files:
+            return {
+                "passed": True,
+                "output": "No tests associated with this file. Skipping pytest.",
+                "return_code": 0,
+            }
+        pytest_targets = list(test_files)
+    else:
+        if not list(tests_root.glob("test_*.py")):
+            return {
+                "passed": True,
+                "output": f"No tests found under {target_dir}. Skipping pytest.",
+                "return_code": 0,
+            }
+        pytest_targets = [target_dir]
 
-    try:
-        result = subprocess.run(
-            [sys.executable, "-m", "pytest", target_dir, "-v", "--tb=short"],
-            capture_output=True,
-            text=True,
-            timeout=120,
+    pytest_args = [*pytest_targets, "-v", "--tb=short"]
+    result = None
+    if test_files is not None and PYTEST_ENGINE == "worker":
+        result = _get_pytest_worker().run(
+            pytest_args,
+            invalidate=changed_files or [],
+            timeout=timeout,
+            cancel_event=cancel_event,
+            root=target_dir,
         )
-        passed = result.returncode == 0
+
+    if result is None:
+        try:
+            result = _run_pytest_subprocess(pytest_args, timeout, cancel_event)
+        except Exception as e:
+            return {"passed": False, "output": str(e), "return_code": -1}
+
+    if result.get("cancelled"):
         return {
-            "passed": passed,
-            "output": result.stdout + result.stderr,
-            "return_code": result.returncode,
+            "passed": False,
+            "output": result["output"],
+            "return_code": result["return_code"],
+            "cancelled": True,
         }
-    except Exception as e:
-        return {"passed": False, "output": str(e), "return_code": -1}
+
+    # Exit code 5 = "no tests collected", e.g. a selected test file without tests
+    passed = result["return_code"] == 0 or (
+        test_files is not None and result["return_code"] == 5
+    )
+    return {
+        "passed": passed,
+        "output": result["output"],
+        "return_code": result["return_code"],
+    }
+
+
+def _run_pytest_subprocess(
+    pytest_args: list, timeout: float, cancel_event: threading.Event = None
+) -> dict:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "pytest", *pytest_args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=0.05)
+            return {"return_code": proc.returncode, "output": stdout + stderr}
+        except subprocess.TimeoutExpired:
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            if not cancelled and time.monotonic() < deadline:
+                continue
+            proc.kill()
+            proc.communicate()
+            if cancelled:
+                return {"return_code": -1, "output": "pytest cancelled", "cancelled": True}
+            return {"return_code": -1, "output": f"pytest timed out after {timeout} seconds"}
+
+
+def _get_pytest_worker() -> PytestWorker:
+    worker = getattr(_pytest_workers, "worker", None)
+    if worker is None:
+        worker = PytestWorker()
+        atexit.register(worker.close)
+        _pytest_workers.worker = worker
+    return worker
+
+
+def find_tests_for_file(file_path: str, target_dir: str) -> list:
+    """
+    Select the test files that exercise file_path.
+
+    Tests named test_<stem>.py (the generate_dataset.py convention) win;
+    otherwise any test file that imports the module, or loads it by file
+    name, is selected.
+    """
+    index = _get_test_index(target_dir)
+    stem = Path(file_path).stem
+    return list(index["by_name"].get(stem) or index["by_import"].get(stem, []))
+
+
+def clear_test_index() -> None:
+    with _test_index_lock:
+        _test_indexes.clear()
+
+
+_test_indexes = {}
+_test_index_lock = threading.Lock()
+
+
+def _get_test_index(target_dir: str) -> dict:
+    # Test files are never rewritten by the swarm, so one scan per run is enough
+    root = os.path.abspath(target_dir)
+    with _test_index_lock:
+        index = _test_indexes.get(root)
+        if index is None:
+            index = _build_test_index(root)
+            _test_indexes[root] = index
+        return index
+
+
+def _build_test_index(root: str) -> dict:
+    by_name = {}
+    by_import = {}
+    for test_file in walk_files(root):
+        test_path = Path(test_file)
+        if not (test_path.name.startswith("test_") and test_path.suffix == ".py"):
+            continue
+        if any(part.startswith(".") for part in test_path.relative_to(root).parts):
+            continue
+        by_name.setdefault(test_path.stem[len("test_"):], []).append(test_file)
+        for module_stem in _imported_module_stems(test_file):
+            by_import.setdefault(module_stem, []).append(test_file)
+    return {"by_name": by_name, "by_import": by_import}
+
+
+def _imported_module_stems(test_file: str) -> set:
+    try:
+        with open(test_file, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=test_file)
+    except (OSError, SyntaxError, ValueError):
+        return set()
+
+    stems = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                stems.update(alias.name.split("."))
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                stems.update(node.module.split("."))
+            stems.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            # importlib loading by file name, e.g. spec_from_file_location(..., "3.py")
+            if node.value.endswith(".py"):
+                stems.add(Path(node.value).stem)
+    return stems
 
 
 def get_pylint_score(file_path: str) -> float:
@@ -0,0 +1,684 @@
+"""
+Deterministic pre-fixes driven by the syntax tree.
+
+Each rule inspects the parsed module and returns text edits (character
+offsets into the source plus replacement text), so formatting and comments
+outside the edited spans are preserved. Rules run in order; after a rule
+changes something the source is re-parsed, and a rule whose edits would not
+parse is dropped for that file. Code that does not parse is returned as is.
+
+    fixed_code, changes = apply_ast_rules(code)
+    fixed_code, changes = apply_ast_rules(code, select_rules(["class_names"]))
+
+DEFAULT_RULES only rewrite code locally. The OPT_IN_RULES change behavior a
+caller may rely on (copying an argument it expected to be updated in place,
+renaming a class other modules import) and only run when asked for.
+"""
+
+import ast
+import re
+
+# A rule may need several passes (e.g. one open() rewrite per block per pass)
+_MAX_PASSES = 10
+_INDENT = "    "
+_LINE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$")
+_CAP_WORDS = re.compile(r"^_*[A-Z][A-Za-z0-9]*$")
+_MUTABLE_CALLS = {"list", "dict", "set", "bytearray"}
+
+
+class _Source:
+    """Source text with (line, byte column) -> character offset conversion."""
+
+    def __init__(self, code: str):
+        self.code = code
+        self.lines = _LINE.findall(code)
+        self.starts = []
+        offset = 0
+        for line in self.lines:
+            self.starts.append(offset)
+            offset += len(line)
+
+    def offset(self, lineno: int, col: int) -> int:
+        if lineno > len(self.lines):
+            return len(self.code)
+        line = self.lines[lineno - 1]
+        # ast columns are UTF-8 byte offsets
+        return self.starts[lineno - 1] + len(line.encode("utf-8")[:col].decode("utf-8", "ignore"))
+
+    def line_start(self, lineno: int) -> int:
+        return self.starts[lineno - 1] if lineno <= len(self.lines) else len(self.code)
+
+    def indent(self, lineno: int) -> str:
+        line = self.lines[lineno - 1]
+        return line[: len(line) - len(line.lstrip(" \t"))]
+
+    def segment(self, node: ast.AST) -> str:
+        return self.code[self.start(node) : self.end(node)]
+
+    def start(self, node: ast.AST) -> int:
+        return self.offset(node.lineno, node.col_offset)
+
+    def end(self, node: ast.AST) -> int:
+        return self.offset(node.end_lineno, node.end_col_offset)
+
+    def starts_line(self, node: ast.AST) -> bool:
+        """True if node is the first thing on its line."""
+        return self.code[self.line_start(node.lineno) : self.start(node)].strip() == ""
+
+    def newline(self) -> str:
+        return "\r\n" if "\r\n" in self.code else "\n"
+
+
+class _Index:
+    """
+    Statement-level view of the tree, built in one pass over statements only.
+
+    Expression nodes make up most of a tree, so they are only walked (once,
+    lazily) by the rules that need every name in the module. Statements
+    directly inside a function body (not in nested functions or classes) are
+    also summarized per function.
+    """
+
+    def __init__(self, tree: ast.Module):
+        self.tree = tree
+        self.exprs = []
+        self.functions = []
+        self.classes = []
+        self.assigns = []
+        self.bodies = []
+        self.returned = {}
+        self.stored = {}
+        self.loops = {}
+        self._names = None
+
+        stack = [(tree.body, None)]
+        while stack:
+            body, func = stack.pop()
+            self.bodies.append(body)
+            for node in body:
+                self._index_statement(node, func)
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    child_func = node
+                elif isinstance(node, ast.ClassDef):
+                    child_func = None
+                else:
+                    child_func = func
+                for child_body in _child_bodies(node):
+                    stack.append((child_body, child_func))
+
+    def _index_statement(self, node: ast.stmt, func) -> None:
+        if isinstance(node, ast.Expr):
+            self.exprs.append(node)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.functions.append(node)
+        elif isinstance(node, ast.ClassDef):
+            self.classes.append(node)
+        elif isinstance(node, ast.Assign):
+            self.assigns.append(node)
+        if func is None:
+            return
+
+        if isinstance(node, ast.Return) and isinstance(node.value, ast.Name):
+            self.returned.setdefault(func, set()).add(node.value.id)
+        for target in _statement_targets(node):
+            self.stored.setdefault(func, set()).update(_bound_names(target))
+        if isinstance(node, ast.For):
+            self.loops.setdefault(func, []).append(node)
+
+    def names(self) -> dict:
+        """Every Name, arg and import alias in the module, by kind."""
+        if self._names is None:
+            self._names = {"name": [], "arg": [], "alias": []}
+            for node in ast.walk(self.tree):
+                if isinstance(node, ast.Name):
+                    self._names["name"].append(node)
+                elif isinstance(node, ast.arg):
+                    self._names["arg"].append(node)
+                elif isinstance(node, ast.alias):
+                    self._names["alias"].append(node)
+        return self._names
+
+
+def apply_ast_rules(code: str, rules=None) -> tuple:
+    """Return (fixed_code, list of change descriptions)."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return code, []
+
+    # The tree is only re-parsed and re-indexed after a rule changed the code
+    changes = []
+    index = _Index(tree)
+    source = _Source(code)
+    for rule in rules or DEFAULT_RULES:
+        for _ in range(_MAX_PASSES):
+            edits, descriptions = rule(index, source)
+            if not edits:
+                break
+            fixed = _apply_edits(code, edits)
+            try:
+                tree = ast.parse(fixed)
+            except (SyntaxError, ValueError):
+                break
+            code = fixed
+            index = _Index(tree)
+            source = _Source(code)
+            changes.extend(descriptions)
+    return code, changes
+
+
+def _apply_edits(code: str, edits: list) -> str:
+    # Right to left, so earlier offsets stay valid
+    for start, end, text in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        code = code[:start] + text + code[end:]
+    return code
+
+
+# --- Rules --------------------------------------------------------------------
+
+
+def rule_comparison_as_assignment(index: _Index, source: _Source):
+    """`a == b` (or `a, b == c, d`) as a whole statement was meant to be `=`."""
+    edits, descriptions = [], []
+    for node in index.exprs:
+        value = node.value
+        if isinstance(value, ast.Compare):
+            leading, compare = [], value
+        elif isinstance(value, ast.Tuple):
+            compares = [i for i, elt in enumerate(value.elts) if isinstance(elt, ast.Compare)]
+            if len(compares) != 1:
+                continue
+            leading, compare = value.elts[: compares[0]], value.elts[compares[0]]
+            # A parenthesized tuple would become an invalid `(a, b = c, d)`
+            if node.col_offset != value.elts[0].col_offset or node.lineno != value.elts[0].lineno:
+                continue
+        else:
+            continue
+
+        if len(compare.ops) != 1 or not isinstance(compare.ops[0], ast.Eq):
+            continue
+        if not all(_is_target(elt) for elt in (*leading, compare.left)):
+            continue
+        if not leading and (
+            node.col_offset != compare.left.col_offset or node.lineno != compare.left.lineno
+        ):
+            continue
+
+        between_start = source.end(compare.left)
+        between = source.code[between_start : source.start(compare.comparators[0])]
+        if between.count("==") != 1 or "(" in between:
+            continue
+        op_start = between_start + between.index("==")
+        edits.append((op_start, op_start + 2, "="))
+        descriptions.append(f"Line {node.lineno}: replaced '==' with '=' in an assignment")
+    return edits, descriptions
+
+
+def rule_open_context_manager(index: _Index, source: _Source):
+    """`f = open(...)` followed by uses of f becomes a `with open(...) as f:` block."""
+    for body in index.bodies:
+        for index, stmt in enumerate(body):
+            name = _opened_file_name(stmt)
+            if name is None or not source.starts_line(stmt):
+                continue
+            edits = _wrap_in_with(body, index, name, source)
+            if edits:
+                # One rewrite per pass: wrapped blocks may contain further candidates
+                return edits, [
+                    f"Line {stmt.lineno}: used a context manager for open() ('{name}')"
+                ]
+    return [], []
+
+
+def rule_mutable_defaults(index: _Index, source: _Source):
+    """Mutable default arguments become None plus an `if arg is None` in the body."""
+    edits, descriptions = [], []
+    for func in index.functions:
+        args = func.args
+        positional = [*args.posonlyargs, *args.args]
+        pairs = list(zip(positional[len(positional) - len(args.defaults) :], args.defaults))
+        pairs += [(arg, default) for arg, default in zip(args.kwonlyargs, args.kw_defaults) if default]
+        mutable = [(arg, default) for arg, default in pairs if _is_mutable_literal(default)]
+        if not mutable:
+            continue
+
+        insert_at, indent = _body_insertion_point(func, source)
+        if insert_at is None:
+            continue
+        newline = source.newline()
+        checks = ""
+        for arg, default in mutable:
+            edits.append((source.start(default), source.end(default), "None"))
+            checks += (
+                f"{indent}if {arg.arg} is None:{newline}"
+                f"{indent}{_INDENT}{arg.arg} = {source.segment(default)}{newline}"
+            )
+            descriptions.append(
+                f"Line {func.lineno}: replaced mutable default of '{arg.arg}' in {func.name}() with None"
+            )
+        edits.append((insert_at, insert_at, checks))
+    return edits, descriptions
+
+
+def rule_argument_side_effects(index: _Index, source: _Source):
+    """
+    A function that copies one dict argument into another key by key and
+    returns it mutates the caller's dict; it now works on a copy instead.
+
+    Only the explicit loop (`for k in src: dst[k] = src[k]`, or over
+    `src.keys()` / `src.items()`) qualifies: `dst.update(src)` and other
+    in-place calls are as likely to be a deliberate in-place API.
+    """
+    edits, descriptions = [], []
+    for func, loops in index.loops.items():
+        params = {arg.arg for arg in (*func.args.posonlyargs, *func.args.args, *func.args.kwonlyargs)}
+        candidates = params & index.returned.get(func, set()) - index.stored.get(func, set())
+        merged = sorted({_merged_param(loop, params) for loop in loops} & candidates)
+        if not merged:
+            continue
+
+        insert_at, indent = _body_insertion_point(func, source)
+        if insert_at is None:
+            continue
+        newline = source.newline()
+        copies = "".join(f"{indent}{name} = {name}.copy(){newline}" for name in merged)
+        edits.append((insert_at, insert_at, copies))
+        descriptions.extend(
+            f"Line {func.lineno}: {func.name}() now copies '{name}' instead of mutating the caller's object"
+            for name in merged
+        )
+    return edits, descriptions
+
+
+def rule_class_names(index: _Index, source: _Source):
+    """
+    Module-level classes are renamed to CapWords, with their in-module
+    references. The old name stays as an alias, so other modules that
+    import it keep working.
+    """
+    candidates = [
+        cls
+        for cls in index.tree.body
+        if isinstance(cls, ast.ClassDef) and not _CAP_WORDS.match(cls.name)
+    ]
+    if not candidates:
+        return [], []
+
+    names = index.names()
+    defined = {node.id for node in names["name"]}
+    defined.update(node.name for node in (*index.functions, *index.classes))
+    defined.update(node.arg for node in names["arg"])
+    defined.update((node.asname or node.name).split(".")[0] for node in names["alias"])
+    exported = set()
+    for node in index.assigns:
+        if any(isinstance(target, ast.Name) and target.id == "__all__" for target in node.targets):
+            exported.update(
+                elt.value for elt in ast.walk(node.value) if isinstance(elt, ast.Constant)
+            )
+
+    edits, descriptions = [], []
+    newline = source.newline()
+    for cls in candidates:
+        position = index.tree.body.index(cls)
+        following = index.tree.body[position + 1 : position + 2]
+        if following and following[0].lineno <= cls.end_lineno:
+            continue
+        new_name = _cap_words(cls.name)
+        if not new_name or new_name in defined or cls.name in exported:
+            continue
+        # The name must only ever refer to this class: no parameters, defs or imports reusing it
+        if _name_is_reused(index, cls):
+            continue
+
+        header = source.code[source.offset(cls.lineno, cls.col_offset) :]
+        match = re.match(r"class\s+" + re.escape(cls.name) + r"\b", header)
+        if not match:
+            continue
+        name_start = source.offset(cls.lineno, cls.col_offset) + match.end() - len(cls.name)
+        edits.append((name_start, name_start + len(cls.name), new_name))
+        for node in names["name"]:
+            if node.id == cls.name:
+                edits.append((source.start(node), source.end(node), new_name))
+        alias_at = source.line_start(cls.end_lineno + 1)
+        separator = "" if source.code[:alias_at].endswith(("\n", "\r")) else newline
+        edits.append(
+            (alias_at, alias_at, f"{separator}{newline}{cls.name} = {new_name}{newline}")
+        )
+        defined.add(new_name)
+        descriptions.append(
+            f"Line {cls.lineno}: renamed class '{cls.name}' to '{new_name}' (PEP8), "
+            f"keeping '{cls.name}' as an alias"
+        )
+    return edits, descriptions
+
+
+def rule_docstrings(index: _Index, source: _Source):
+    """Add the module, class and function docstrings pylint reports as missing."""
+    edits, descriptions = [], []
+    newline = source.newline()
+    tree = index.tree
+    if tree.body and ast.get_docstring(tree, clean=False) is None:
+        start = source.line_start(_first_line(tree.body[0]))
+        edits.append((start, start, f'"""Auto-generated module docstring."""{newline}'))
+        descriptions.append("Added module docstring")
+
+    for node in (*index.functions, *index.classes):
+        # pylint's default no-docstring-rgx exempts names starting with "_"
+        if node.name.startswith("_") or ast.get_docstring(node, clean=False) is not None:
+            continue
+        first = node.body[0]
+        if first.lineno <= _header_end(node) or not source.starts_line(first):
+            continue
+        indent = source.indent(first.lineno)
+        start = source.line_start(_first_line(first))
+        edits.append((start, start, f'{indent}"""{_describe(node)}"""{newline}'))
+        descriptions.append(f"Line {node.lineno}: added docstring to {node.name}")
+    return edits, descriptions
+
+
+ALL_RULES = (
+    rule_comparison_as_assignment,
+    rule_open_context_manager,
+    rule_mutable_defaults,
+    rule_argument_side_effects,
+    rule_class_names,
+    rule_docstrings,
+)
+
+OPT_IN_RULES = {
+    "argument_side_effects": rule_argument_side_effects,
+    "class_names": rule_class_names,
+}
+
+DEFAULT_RULES = tuple(rule for rule in ALL_RULES if rule not in OPT_IN_RULES.values())
+
+
+def select_rules(opt_in=()) -> tuple:
+    """DEFAULT_RULES plus the named OPT_IN_RULES, in ALL_RULES order."""
+    unknown = set(opt_in) - set(OPT_IN_RULES)
+    if unknown:
+        raise ValueError(
+            f"Unknown AST rules: {', '.join(sorted(unknown))} "
+            f"(available: {', '.join(OPT_IN_RULES)})"
+        )
+    chosen = {OPT_IN_RULES[name] for name in opt_in}
+    return tuple(rule for rule in ALL_RULES if rule in DEFAULT_RULES or rule in chosen)
+
+
+# --- Helpers ------------------------------------------------------------------
+
+
+def _is_target(node: ast.AST) -> bool:
+    if isinstance(node, (ast.Name, ast.Attribute, ast.Subscript)):
+        return True
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return all(_is_target(elt) for elt in node.elts)
+    return False
+
+
+def _opened_file_name(stmt: ast.stmt):
+    if (
+        isinstance(stmt, ast.Assign)
+        and len(stmt.targets) == 1
+        and isinstance(stmt.targets[0], ast.Name)
+        and isinstance(stmt.value, ast.Call)
+        and isinstance(stmt.value.func, ast.Name)
+        and stmt.value.func.id == "open"
+    ):
+        return stmt.targets[0].id
+    return None
+
+
+def _wrap_in_with(body: list, index: int, name: str, source: _Source):
+    stmt = body[index]
+    following = body[index + 1 :]
+    uses = [i for i, other in enumerate(following) if _references(other, name)]
+    if not uses:
+        return []
+    wrapped = following[: uses[-1] + 1]
+
+    for other in wrapped:
+        for node in ast.walk(other):
+            # The file object must not outlive the block: returned, yielded,
+            # aliased, passed to a call (which may keep it), put in a container
+            # or captured by a nested function, class or lambda
+            if _escape_slots(node, name):
+                return []
+            if isinstance(
+                node, (ast.Lambda, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+            ) and _references(node, name):
+                return []
+            if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Store):
+                return []
+            if isinstance(node, (ast.Global, ast.Nonlocal)) and name in node.names:
+                return []
+            # Indenting a multi-line string would change its value
+            if isinstance(node, (ast.Constant, ast.JoinedStr)) and node.lineno != node.end_lineno:
+                return []
+
+    first_line = _first_line(wrapped[0])
+    last_line = wrapped[-1].end_lineno
+    if stmt.end_lineno >= first_line or "\t" in source.indent(stmt.lineno):
+        return []
+    if index + 1 + len(wrapped) < len(body) and body[index + 1 + len(wrapped)].lineno <= last_line:
+        return []
+
+    closes = [other for other in wrapped if _is_close_call(other, name)]
+    if len(closes) == len(wrapped):
+        return []
+
+    edits = [
+        (
+            source.start(stmt),
+            source.end(stmt),
+            f"with {source.segment(stmt.value)} as {name}:",
+        )
+    ]
+    close_lines = set()
+    for close in closes:
+        close_lines.update(range(close.lineno, close.end_lineno + 1))
+        start = source.line_start(close.lineno)
+        end = source.line_start(close.end_lineno + 1)
+        edits.append((start, end, ""))
+    for lineno in range(first_line, last_line + 1):
+        if lineno in close_lines or not source.lines[lineno - 1].strip():
+            continue
+        start = source.line_start(lineno)
+        edits.append((start, start, _INDENT))
+    return edits
+
+
+def _escape_slots(node: ast.AST, name: str) -> bool:
+    """True if node hands the bare name on: as a value, a call argument or a container item."""
+    if isinstance(node, ast.Call):
+        slots = [*node.args, *(keyword.value for keyword in node.keywords)]
+    elif isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        slots = node.elts
+    elif isinstance(node, ast.Dict):
+        slots = [*node.keys, *node.values]
+    elif isinstance(
+        node,
+        (ast.Return, ast.Yield, ast.YieldFrom, ast.Assign, ast.AnnAssign, ast.AugAssign, ast.NamedExpr),
+    ):
+        slots = [node.value]
+    else:
+        return False
+    for slot in slots:
+        if isinstance(slot, ast.Starred):
+            slot = slot.value
+        if isinstance(slot, ast.Name) and slot.id == name and isinstance(slot.ctx, ast.Load):
+            return True
+    return False
+
+
+def _is_close_call(stmt: ast.stmt, name: str) -> bool:
+    return (
+        isinstance(stmt, ast.Expr)
+        and isinstance(stmt.value, ast.Call)
+        and not stmt.value.args
+        and isinstance(stmt.value.func, ast.Attribute)
+        and stmt.value.func.attr == "close"
+        and isinstance(stmt.value.func.value, ast.Name)
+        and stmt.value.func.value.id == name
+    )
+
+
+def _references(node: ast.AST, name: str) -> bool:
+    return node is not None and any(
+        isinstance(child, ast.Name) and child.id == name for child in ast.walk(node)
+    )
+
+
+def _is_mutable_literal(node: ast.AST) -> bool:
+    if isinstance(node, (ast.List, ast.Dict, ast.Set, ast.ListComp, ast.DictComp, ast.SetComp)):
+        return True
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _MUTABLE_CALLS
+    )
+
+
+def _body_insertion_point(func: ast.AST, source: _Source):
+    """Offset and indentation for statements added at the top of func's body."""
+    body = func.body
+    if body[0].lineno <= _header_end(func) or not source.starts_line(body[0]):
+        return None, None
+    indent = source.indent(body[0].lineno)
+    if ast.get_docstring(func, clean=False) is not None:
+        if len(body) > 1:
+            if body[1].lineno <= body[0].end_lineno:
+                return None, None
+            return source.line_start(_first_line(body[1])), indent
+        return source.line_start(body[0].end_lineno + 1), indent
+    return source.line_start(_first_line(body[0])), indent
+
+
+def _merged_param(loop: ast.For, params: set):
+    """The parameter a key-by-key dict copy loop writes into, or None."""
+    if loop.orelse or len(loop.body) != 1 or not isinstance(loop.body[0], ast.Assign):
+        return None
+    assign = loop.body[0]
+    if len(assign.targets) != 1 or not isinstance(assign.targets[0], ast.Subscript):
+        return None
+    target = assign.targets[0]
+    if not isinstance(target.value, ast.Name) or not isinstance(target.slice, ast.Name):
+        return None
+    destination, key = target.value.id, target.slice.id
+
+    iterated = loop.iter
+    method = None
+    if (
+        isinstance(iterated, ast.Call)
+        and isinstance(iterated.func, ast.Attribute)
+        and not iterated.args
+        and not iterated.keywords
+    ):
+        method, iterated = iterated.func.attr, iterated.func.value
+    if not isinstance(iterated, ast.Name):
+        return None
+    origin = iterated.id
+    if origin == destination or {origin, destination} - params:
+        return None
+
+    value = assign.value
+    if method in (None, "keys"):
+        # for k in src: dst[k] = src[k]
+        matches = (
+            isinstance(loop.target, ast.Name)
+            and loop.target.id == key
+            and isinstance(value, ast.Subscript)
+            and isinstance(value.value, ast.Name)
+            and value.value.id == origin
+            and isinstance(value.slice, ast.Name)
+            and value.slice.id == key
+        )
+    elif method == "items":
+        # for k, v in src.items(): dst[k] = v
+        matches = (
+            isinstance(loop.target, ast.Tuple)
+            and len(loop.target.elts) == 2
+            and all(isinstance(elt, ast.Name) for elt in loop.target.elts)
+            and loop.target.elts[0].id == key
+            and isinstance(value, ast.Name)
+            and value.id == loop.target.elts[1].id
+        )
+    else:
+        matches = False
+    return destination if matches else None
+
+
+def _cap_words(name: str) -> str:
+    prefix = name[: len(name) - len(name.lstrip("_"))]
+    parts = [part for part in name.lstrip("_").split("_") if part]
+    new_name = prefix + "".join(part[0].upper() + part[1:] for part in parts)
+    return new_name if _CAP_WORDS.match(new_name) else ""
+
+
+def _name_is_reused(index: _Index, cls: ast.ClassDef) -> bool:
+    names = index.names()
+    return (
+        any(node.name == cls.name for node in (*index.functions, *index.classes) if node is not cls)
+        or any(node.arg == cls.name for node in names["arg"])
+        or any((node.asname or node.name) == cls.name for node in names["alias"])
+        or any(node.id == cls.name and isinstance(node.ctx, ast.Store) for node in names["name"])
+    )
+
+
+def _child_bodies(node: ast.stmt):
+    for field in ("body", "orelse", "finalbody"):
+        body = getattr(node, field, None)
+        if body:
+            yield body
+    for handler in getattr(node, "handlers", ()):
+        yield handler.body
+    for case in getattr(node, "cases", ()):
+        yield case.body
+
+
+def _statement_targets(node: ast.stmt) -> list:
+    if isinstance(node, ast.Assign):
+        return node.targets
+    if isinstance(node, (ast.AugAssign, ast.AnnAssign, ast.For, ast.AsyncFor)):
+        return [node.target]
+    if isinstance(node, (ast.With, ast.AsyncWith)):
+        return [item.optional_vars for item in node.items if item.optional_vars is not None]
+    return []
+
+
+def _bound_names(target: ast.AST):
+    """Names rebound by an assignment target; `x[k] = v` and `x.a = v` rebind nothing."""
+    if isinstance(target, ast.Name):
+        yield target.id
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        for element in target.elts:
+            yield from _bound_names(element)
+    elif isinstance(target, ast.Starred):
+        yield from _bound_names(target.value)
+
+
+def _first_line(node: ast.AST) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno, *(decorator.lineno for decorator in decorators)])
+
+
+def _header_end(node: ast.AST) -> int:
+    """Last line of a def/class header (the line holding the colon)."""
+    candidates = [node.lineno]
+    if isinstance(node, ast.ClassDef):
+        candidates += [base.end_lineno for base in node.bases]
+        candidates += [keyword.end_lineno for keyword in node.keywords]
+    else:
+        for arg in ast.walk(node.args):
+            if hasattr(arg, "end_lineno"):
+                candidates.append(arg.end_lineno)
+        if node.returns is not None:
+            candidates.append(node.returns.end_lineno)
+    return max(candidates)
+
+
+def _describe(node: ast.AST) -> str:
+    if isinstance(node, ast.ClassDef):
+        return f"{node.name} class."
+    words = node.name.strip("_").replace("_", " ")
+    return f"{words[:1].upper()}{words[1:]}." if words else "Function."
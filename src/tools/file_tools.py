@@ -1,4 +1,11 @@
 import os
+from src.tools.ignore_rules import DEFAULT_IGNORES, IgnoreRules
+
+# Extra comma-separated gitignore-style patterns that file discovery skips
+DISCOVERY_EXCLUDE = [
+    p.strip() for p in os.getenv("DISCOVERY_EXCLUDE", "").split(",") if p.strip()
+]
+DISCOVERY_GITIGNORE = os.getenv("DISCOVERY_GITIGNORE", "true").lower() == "true"
 
 _sandbox_root = None
 
@@ -38,11 +45,58 @@ def write_file(path: str, content: str) -> None:
 
 
 def list_python_files(directory: str) -> list:
+    return list(iter_python_files(directory))
+
+
+def iter_python_files(
+    directory: str, ignore: IgnoreRules = None, sorted_output: bool = True
+):
+    """
+    Lazily yield the source files (not test_*.py) under directory.
+
+    Ignored directories are pruned without being entered (see walk_files).
+    sorted_output keeps the order of sorted(list of paths), so runs are
+    reproducible; without it files come in directory-listing order.
+    """
     safe_dir = _validate_path(directory)
-    files = []
-    for root, _, filenames in os.walk(safe_dir):
-        for filename in filenames:
-            if filename.endswith(".py") and not filename.startswith("test_"):
-                files.append(os.path.join(root, filename))
+    return (
+        path
+        for path in walk_files(safe_dir, ignore, sorted_output)
+        if path.endswith(".py") and not os.path.basename(path).startswith("test_")
+    )
+
+
+def walk_files(directory: str, ignore: IgnoreRules = None, sorted_output: bool = True):
+    """
+    Yield every file under directory with os.scandir, skipping ignored paths.
+
+    By default DEFAULT_IGNORES (.git, virtualenvs, node_modules, caches...),
+    DISCOVERY_EXCLUDE and the tree's .gitignore files decide what is ignored.
+    """
+    root = os.path.abspath(directory)
+    if ignore is None:
+        ignore = IgnoreRules(
+            root,
+            [*DEFAULT_IGNORES, *DISCOVERY_EXCLUDE],
+            use_gitignore=DISCOVERY_GITIGNORE,
+        )
+    return _scan(root, "", ignore, sorted_output)
+
+
+def _scan(root: str, rel_dir: str, ignore: IgnoreRules, sorted_output: bool):
+    try:
+        with os.scandir(os.path.join(root, rel_dir)) as it:
+            entries = list(it)
+    except OSError:
+        return
+    if sorted_output:
+        # A directory sorts as "name/", which is where its files fall in a sorted path list
+        entries.sort(key=lambda e: e.name + "/" if e.is_dir(follow_symlinks=False) else e.name)
 
-    return sorted(files)
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        if entry.is_dir(follow_symlinks=False):
+            if not ignore.is_ignored(rel_path, is_dir=True):
+                yield from _scan(root, rel_path, ignore, sorted_output)
+        elif entry.is_file() and not ignore.is_ignored(rel_path):
+            yield entry.path
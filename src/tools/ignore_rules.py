@@ -0,0 +1,132 @@
+import os
+import re
+
+# Never worth walking: VCS metadata, virtualenvs, installed packages, caches
+DEFAULT_IGNORES = (
+    ".git/",
+    ".hg/",
+    ".svn/",
+    "venv/",
+    ".venv/",
+    "node_modules/",
+    "site-packages/",
+    "__pycache__/",
+    ".tox/",
+    ".nox/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    ".cache/",
+    "*.pyc",
+)
+
+
+class IgnoreRules:
+    """
+    Gitignore-style path matcher rooted at a directory.
+
+    Patterns follow .gitignore syntax: `*`, `?`, `**`, `[...]`, a trailing `/`
+    for directories only, a leading `!` to re-include, and patterns containing
+    a `/` are anchored to the directory that declares them. The last matching
+    rule wins. With use_gitignore, .gitignore files are read from the root and
+    from every directory on the way down, as git does.
+    """
+
+    def __init__(self, root: str, patterns=DEFAULT_IGNORES, use_gitignore: bool = True):
+        self.root = os.path.abspath(root)
+        self.use_gitignore = use_gitignore
+        self._rules = [_compile(pattern, "") for pattern in patterns]
+        self._rules = [rule for rule in self._rules if rule is not None]
+        self._gitignore_rules = {}
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """rel_path is relative to root, with "/" separators."""
+        ignored = False
+        for base, regex, negate, dir_only in self._applicable_rules(rel_path):
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                candidate = rel_path[len(base) + 1 :]
+            else:
+                candidate = rel_path
+            if regex.fullmatch(candidate):
+                ignored = not negate
+        return ignored
+
+    def _applicable_rules(self, rel_path: str) -> list:
+        if not self.use_gitignore:
+            return self._rules
+        rules = list(self._rules)
+        parts = rel_path.split("/")[:-1]
+        for depth in range(len(parts) + 1):
+            rules.extend(self._gitignore_for("/".join(parts[:depth])))
+        return rules
+
+    def _gitignore_for(self, rel_dir: str) -> list:
+        rules = self._gitignore_rules.get(rel_dir)
+        if rules is None:
+            rules = []
+            path = os.path.join(self.root, rel_dir, ".gitignore")
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        rule = _compile(line.rstrip("\n"), rel_dir)
+                        if rule is not None:
+                            rules.append(rule)
+            except OSError:
+                pass
+            self._gitignore_rules[rel_dir] = rules
+        return rules
+
+
+def _compile(pattern: str, base: str):
+    """Turn one gitignore line into (base, regex, negate, dir_only), or None."""
+    pattern = pattern.rstrip()
+    if not pattern or pattern.startswith("#"):
+        return None
+
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex = _glob_to_regex(pattern)
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return base, re.compile(regex), negate, dir_only
+
+
+def _glob_to_regex(pattern: str) -> str:
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            regex.append(f"[{body}]")
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(regex)
@@ -0,0 +1,33 @@
+def apply_edits(code: str, edits: list) -> str:
+    """
+    Apply search/replace edits to code and return the patched code.
+
+    Each edit is {"search": exact text, "replace": new text}; edits apply in
+    order, each to the result of the previous one. The search text must occur
+    exactly once, otherwise the edit is ambiguous or stale. Raises ValueError
+    if an edit cannot be applied or the result is not valid Python.
+    """
+    if not isinstance(edits, list) or not edits:
+        raise ValueError("No edits to apply")
+
+    patched = code
+    for index, edit in enumerate(edits, start=1):
+        if not isinstance(edit, dict):
+            raise ValueError(f"Edit {index} is not an object")
+        search = edit.get("search")
+        replace = edit.get("replace")
+        if not isinstance(search, str) or not isinstance(replace, str) or not search:
+            raise ValueError(f"Edit {index} needs non-empty 'search' and a 'replace' string")
+
+        count = patched.count(search)
+        if count == 0:
+            raise ValueError(f"Edit {index}: search text not found")
+        if count > 1:
+            raise ValueError(f"Edit {index}: search text matches {count} places")
+        patched = patched.replace(search, replace, 1)
+
+    try:
+        compile(patched, "<patched>", "exec")
+    except (SyntaxError, ValueError) as e:
+        raise ValueError(f"Patched code does not compile: {e}") from e
+    return patched
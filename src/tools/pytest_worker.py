@@ -0,0 +1,222 @@
+"""
+Long-lived pytest worker.
+
+The worker is a separate interpreter that imports pytest once and then runs
+one pytest session per request, so repeated Judge evaluations skip interpreter
+start-up and plugin loading. Before each session it drops every module loaded
+from the target directory (and the listed paths) from sys.modules, so files
+rewritten since the last session, by this Judge or by another worker thread,
+are re-imported from disk as a fresh `python -m pytest` would.
+
+Protocol: one JSON object per line on stdin/stdout.
+    request:  {"args": [...], "invalidate": [paths], "root": dir or null}
+    response: {"return_code": int, "output": str, "rss_kb": int}
+"""
+
+import contextlib
+import io
+import json
+import os
+import select
+import subprocess
+import sys
+import sysconfig
+import threading
+import time
+
+# Recycle the worker after this many sessions or once its peak RSS exceeds the limit
+PYTEST_WORKER_MAX_RUNS = int(os.getenv("PYTEST_WORKER_MAX_RUNS", "50"))
+PYTEST_WORKER_MAX_RSS_MB = int(os.getenv("PYTEST_WORKER_MAX_RSS_MB", "512"))
+
+# How often a waiting caller checks for cancellation, in seconds
+_POLL_INTERVAL = 0.05
+
+
+class PytestWorker:
+    def __init__(
+        self,
+        max_runs: int = PYTEST_WORKER_MAX_RUNS,
+        max_rss_mb: int = PYTEST_WORKER_MAX_RSS_MB,
+    ):
+        self.max_runs = max_runs
+        self.max_rss_mb = max_rss_mb
+        self._proc = None
+        self._runs = 0
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        args: list,
+        invalidate: list = (),
+        timeout: float = 120,
+        cancel_event: threading.Event = None,
+        root: str = None,
+    ):
+        """
+        Run one pytest session in the worker.
+
+        Modules loaded from under root and the invalidate paths are
+        re-imported from disk.
+
+        Returns {"return_code", "output"}, or None if the worker could not
+        be started or died mid-run (callers then fall back to a subprocess).
+        Setting cancel_event kills the session; the result then has
+        "cancelled": True.
+        """
+        request = json.dumps(
+            {
+                "args": list(args),
+                "invalidate": [os.path.abspath(p) for p in invalidate],
+                "root": os.path.abspath(root) if root else None,
+            }
+        )
+        with self._lock:
+            try:
+                if self._proc is None or self._proc.poll() is not None:
+                    self._start()
+                self._proc.stdin.write(request + "\n")
+                self._proc.stdin.flush()
+
+                deadline = time.monotonic() + timeout
+                while True:
+                    remaining = deadline - time.monotonic()
+                    ready, _, _ = select.select(
+                        [self._proc.stdout], [], [], max(0, min(_POLL_INTERVAL, remaining))
+                    )
+                    if ready:
+                        break
+                    # A busy worker never reads stdin again, so kill it outright
+                    if cancel_event is not None and cancel_event.is_set():
+                        self._stop(kill=True)
+                        return {
+                            "return_code": -1,
+                            "output": "pytest cancelled",
+                            "cancelled": True,
+                        }
+                    if remaining <= 0:
+                        self._stop(kill=True)
+                        return {
+                            "return_code": -1,
+                            "output": f"pytest timed out after {timeout} seconds",
+                        }
+                line = self._proc.stdout.readline()
+                if not line:
+                    self._stop()
+                    return None
+                response = json.loads(line)
+            except (OSError, ValueError):
+                self._stop()
+                return None
+
+            self._runs += 1
+            if (
+                self._runs >= self.max_runs
+                or response.get("rss_kb", 0) > self.max_rss_mb * 1024
+            ):
+                self._stop()
+
+        return {"return_code": response["return_code"], "output": response["output"]}
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+    def _start(self) -> None:
+        self._proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+        )
+        self._runs = 0
+
+    def _stop(self, kill: bool = False) -> None:
+        if self._proc is None:
+            return
+        try:
+            if kill:
+                self._proc.kill()
+            self._proc.stdin.close()
+            self._proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._proc.kill()
+            self._proc.wait()
+        self._proc = None
+
+
+def _invalidate_modules(paths: set, root: str = None, keep_dirs: tuple = ()) -> None:
+    """Drop modules loaded from paths or from under root, except those under keep_dirs."""
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if not module_file or name == "__main__":
+            continue
+        module_file = os.path.abspath(module_file)
+        if module_file.startswith(keep_dirs):
+            continue
+        if module_file in paths or (root and module_file.startswith(root + os.sep)):
+            del sys.modules[name]
+
+
+def _peak_rss_kb() -> int:
+    try:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return 0
+
+
+def _serve() -> None:
+    # Same import path as `python -m pytest` run from the caller's directory
+    sys.path[0] = os.getcwd()
+    # Bytecode for rewritten files could be reused if mtime and size match
+    sys.dont_write_bytecode = True
+
+    # Keep a private handle on the real stdout for the protocol and point fd 1 at
+    # /dev/null, so nothing a test prints can corrupt a response line
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    import pytest
+
+    # The interpreter's own libraries (pytest included) stay loaded even when
+    # they live under the target, e.g. a virtualenv inside the project
+    keep_dirs = tuple(
+        os.path.abspath(path) + os.sep
+        for key, path in sysconfig.get_paths().items()
+        if key in ("stdlib", "platstdlib", "purelib", "platlib")
+    )
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        args = request["args"]
+        targets = set(request.get("invalidate", []))
+        targets.update(os.path.abspath(arg) for arg in args if arg.endswith(".py"))
+        _invalidate_modules(targets, request.get("root"), keep_dirs)
+
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            try:
+                return_code = int(pytest.main(args))
+            except BaseException as e:
+                print(f"pytest worker error: {e}")
+                return_code = -1
+
+        protocol_out.write(
+            json.dumps(
+                {
+                    "return_code": return_code,
+                    "output": buffer.getvalue(),
+                    "rss_kb": _peak_rss_kb(),
+                }
+            )
+            + "\n"
+        )
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    _serve()
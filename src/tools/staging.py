@@ -0,0 +1,126 @@
+import fnmatch
+import hashlib
+import os
+import shutil
+import threading
+from src.tools.ignore_rules import DEFAULT_IGNORES, IgnoreRules
+
+
+def stage_directory(
+    source_dir: str,
+    dest_dir: str,
+    include: list = None,
+    exclude: list = None,
+    use_gitignore: bool = True,
+    hardlink: bool = False,
+    compare: str = "mtime",
+    skip=None,
+) -> dict:
+    """
+    Mirror source_dir into dest_dir, copying only what changed.
+
+    Ignored directories (DEFAULT_IGNORES, exclude patterns and, with
+    use_gitignore, .gitignore files) are never walked. When include patterns
+    are given, only files matching one of them are staged. A file is copied
+    when the destination is missing or differs by size and mtime (or by
+    content, with compare="hash"). With hardlink, non-Python files are linked
+    instead of copied; Python files are always real copies, since the Fixer
+    rewrites them in place. skip(rel_path, source_path, dest_path) can veto
+    individual files. dest_dir is left out when it lives inside source_dir.
+
+    Returns counts: {"copied", "linked", "unchanged", "skipped"}.
+    """
+    source_root = os.path.abspath(source_dir)
+    dest_root = os.path.abspath(dest_dir)
+    rules = IgnoreRules(
+        source_root, [*DEFAULT_IGNORES, *(exclude or [])], use_gitignore=use_gitignore
+    )
+    stats = {"copied": 0, "linked": 0, "unchanged": 0, "skipped": 0}
+
+    for rel_path, source_path in _walk(source_root, rules, dest_root):
+        if include and not _matches_any(rel_path, include):
+            continue
+        dest_path = os.path.join(dest_root, rel_path)
+        if skip is not None and skip(rel_path, source_path, dest_path):
+            stats["skipped"] += 1
+            continue
+
+        link = hardlink and not rel_path.endswith(".py")
+        if _is_current(source_path, dest_path, compare, link):
+            stats["unchanged"] += 1
+            continue
+
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if link and _link(source_path, dest_path):
+            stats["linked"] += 1
+        else:
+            _copy(source_path, dest_path)
+            stats["copied"] += 1
+
+    return stats
+
+
+def _walk(root: str, rules: IgnoreRules, dest_root: str, rel_dir: str = ""):
+    directory = os.path.join(root, rel_dir)
+    try:
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    except OSError:
+        return
+
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        if entry.is_dir(follow_symlinks=False):
+            if entry.path == dest_root or rules.is_ignored(rel_path, is_dir=True):
+                continue
+            yield from _walk(root, rules, dest_root, rel_path)
+        elif entry.is_file() and not rules.is_ignored(rel_path):
+            yield rel_path, entry.path
+
+
+def _matches_any(rel_path: str, patterns: list) -> bool:
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern)
+        for pattern in patterns
+    )
+
+
+def _is_current(source_path: str, dest_path: str, compare: str, link: bool) -> bool:
+    try:
+        source_stat = os.stat(source_path)
+        dest_stat = os.stat(dest_path)
+    except OSError:
+        return False
+    if link:
+        return os.path.samestat(source_stat, dest_stat)
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if compare == "hash":
+        return _file_digest(source_path) == _file_digest(dest_path)
+    return int(source_stat.st_mtime) == int(dest_stat.st_mtime)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _copy(source_path: str, dest_path: str) -> None:
+    # Copy beside the target and rename over it: never writes through an existing hardlink
+    tmp_path = f"{dest_path}.{threading.get_ident()}.staging"
+    shutil.copy2(source_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+def _link(source_path: str, dest_path: str) -> bool:
+    tmp_path = f"{dest_path}.{threading.get_ident()}.staging"
+    try:
+        os.link(source_path, tmp_path)
+    except OSError:
+        # Different filesystem, or links unsupported: the caller copies instead
+        return False
+    os.replace(tmp_path, dest_path)
+    return True
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+
+CHECKPOINT_NAME = ".swarm_checkpoint.jsonl"
+
+
+class Checkpoint:
+    """
+    Append-only journal of an Orchestrator run, kept in the work directory.
+
+    Each event (an analysis, a judged iteration, a finished file) is one JSON
+    line, appended and flushed as it happens, so a crash loses at most the
+    event being written; a torn last line is dropped on load. Replaying the
+    journal gives the audit results, the latest iteration state of each file
+    and the finished files, which is what a resumed run needs to skip work
+    that is already done.
+
+    Events name their file by its path relative to the work directory, and
+    absolute paths are rebuilt from it on load, so a checkpoint still
+    applies after the work directory has been moved.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, CHECKPOINT_NAME)
+        self.analyses = {}
+        self.iterations = {}
+        self.completed = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, CHECKPOINT_NAME))
+
+    def key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.directory).replace(os.sep, "/")
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+
+        # Cut a partially written last line so new events start on a clean line
+        complete = data[: data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(len(complete))
+
+        for line in complete.decode("utf-8").splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            self._apply(event)
+
+    def reset(self) -> None:
+        self.remove()
+        self.analyses.clear()
+        self.iterations.clear()
+        self.completed.clear()
+
+    def record_analysis(self, analysis: dict) -> None:
+        self._append(
+            {"type": "analysis", "key": self.key(analysis.get("file_path") or ""), "analysis": analysis}
+        )
+
+    def record_iteration(
+        self, file_path: str, iteration: int, error_logs: str, previous_fix: dict
+    ) -> None:
+        self._append(
+            {
+                "type": "iteration",
+                "key": self.key(file_path),
+                "iteration": iteration,
+                "error_logs": error_logs,
+                "previous_fix": previous_fix,
+            }
+        )
+
+    def record_completed(self, file_path: str, result: dict) -> None:
+        self._append({"type": "completed", "key": self.key(file_path), "result": result})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, event: dict) -> None:
+        key = event.get("key")
+        if key is None:
+            key = self.key(event.get("file") or "")
+        full_path = os.path.join(self.directory, *key.split("/"))
+        kind = event.get("type")
+        if kind == "analysis":
+            analysis = event["analysis"]
+            analysis["file_path"] = full_path
+            self.analyses[key] = analysis
+        elif kind == "iteration":
+            previous_fix = event.get("previous_fix")
+            if isinstance(previous_fix, dict) and "file_path" in previous_fix:
+                previous_fix["file_path"] = full_path
+            self.iterations[key] = {
+                "iteration": event["iteration"],
+                "error_logs": event.get("error_logs"),
+                "previous_fix": previous_fix,
+            }
+        elif kind == "completed":
+            result = event["result"]
+            if "file" in result:
+                result["file"] = full_path
+            self.completed[key] = result
+
+    def _append(self, event: dict) -> None:
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._apply(json.loads(line))
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
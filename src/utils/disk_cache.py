@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+import zlib
+
+
+class DiskCache:
+    """
+    Small on-disk key/value store: one JSON file per entry, named by key.
+
+    Entries are evicted least-recently-used first once the store grows past
+    max_entries (or max_bytes); a hit refreshes the entry's mtime, which is the
+    recency clock. Entries older than ttl_seconds are treated as misses.
+    With compress=True values are stored zlib-compressed.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: int = 2000,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0,
+        compress: bool = False,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._suffix = ".json.z" if compress else ".json"
+        self._lock = threading.Lock()
+        self._entry_count = None
+        self._total_bytes = None
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = self._decode(f.read())
+            value = entry["value"]
+            if self.ttl_seconds and time.time() - entry["created"] > self.ttl_seconds:
+                raise KeyError("expired")
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value) -> None:
+        path = self._path(key)
+        data = self._encode({"created": time.time(), "value": value})
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else None
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # A cache that cannot be written is just a cache miss next time
+            return
+
+        with self._lock:
+            if self._entry_count is None:
+                self._count_entries()
+            elif previous_size is None:
+                self._entry_count += 1
+                self._total_bytes += len(data)
+            else:
+                self._total_bytes += len(data) - previous_size
+            if self._entry_count > self.max_entries or (
+                self.max_bytes and self._total_bytes > self.max_bytes
+            ):
+                self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self._suffix}")
+
+    def _encode(self, entry: dict) -> bytes:
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        return zlib.compress(data) if self.compress else data
+
+    def _decode(self, data: bytes) -> dict:
+        if self.compress:
+            data = zlib.decompress(data)
+        return json.loads(data.decode("utf-8"))
+
+    def _entries(self) -> list:
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self._suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def _count_entries(self) -> None:
+        entries = self._entries()
+        self._entry_count = len(entries)
+        self._total_bytes = sum(size for _, size, _ in entries)
+
+    def _evict(self) -> None:
+        # Trim to 90% of the limits so eviction does not run on every put
+        entries = sorted(self._entries())
+        max_count = int(self.max_entries * 0.9)
+        max_bytes = int(self.max_bytes * 0.9)
+        count = len(entries)
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if count <= max_count and (not self.max_bytes or total_bytes <= max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            count -= 1
+            total_bytes -= size
+
+        self._entry_count = count
+        self._total_bytes = total_bytes
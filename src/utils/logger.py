@@ -1,12 +1,37 @@
+import atexit
 import json
 import os
+import queue
+import threading
 import uuid
 from datetime import datetime
 from enum import Enum
+from src.utils.tracing import stage
 
-# Chemin du fichier de logs
+# Chemin du fichier de logs (format tableau JSON, conservé pour l'outillage existant)
 LOG_FILE = os.path.join("logs", "experiment_data.json")
 
+# Journal principal : une entrée JSON par ligne, en ajout seul (append-only)
+JSONL_LOG_FILE = os.path.join("logs", "experiment_data.jsonl")
+
+# Taille du tampon d'écriture (octets) avant un vidage automatique sur disque
+LOG_BUFFER_SIZE = 64 * 1024
+
+# Taille maximale de la file d'attente : au-delà, log_experiment bloque (contre-pression)
+LOG_QUEUE_SIZE = 1000
+
+# Nombre maximal d'entrées écrites en un seul lot
+LOG_BATCH_SIZE = 100
+
+# Intervalle (secondes) auquel flush_logs vérifie que le thread d'écriture est toujours vivant
+LOG_FLUSH_POLL_SECONDS = 1.0
+
+_writer = None
+_writer_lock = threading.Lock()
+
+# Marqueur d'arrêt du thread d'écriture
+_STOP = object()
+
 class ActionType(str, Enum):
     """
     Énumération des types d'actions possibles pour standardiser l'analyse.
@@ -16,6 +41,7 @@ class ActionType(str, Enum):
     DEBUG = "DEBUG"             # Analyse d'erreurs d'exécution
     FIX = "FIX"                 # Application de correctifs
 
+@stage("log")
 def log_experiment(agent_name: str, model_used: str, action: ActionType, details: dict, status: str):
     """
     Enregistre une interaction d'agent pour l'analyse scientifique.
@@ -56,9 +82,6 @@ def log_experiment(agent_name: str, model_used: str, action: ActionType, details
             )
 
     # --- 3. PRÉPARATION DE L'ENTRÉE ---
-    # Création du dossier logs s'il n'existe pas
-    os.makedirs("logs", exist_ok=True)
-    
     entry = {
         "id": str(uuid.uuid4()),  # ID unique pour éviter les doublons lors de la fusion des données
         "timestamp": datetime.now().isoformat(),
@@ -69,21 +92,215 @@ def log_experiment(agent_name: str, model_used: str, action: ActionType, details
         "status": status
     }
 
-    # --- 4. LECTURE & ÉCRITURE ROBUSTE ---
-    data = []
-    if os.path.exists(LOG_FILE):
+    # --- 4. SÉRIALISATION ---
+    # Faite ici, dans l'appelant : une valeur non sérialisable (set, objet...) lève
+    # TypeError immédiatement au lieu de faire tomber le thread d'écriture.
+    line = json.dumps(entry, ensure_ascii=False)
+
+    # --- 5. ÉCRITURE EN ARRIÈRE-PLAN ---
+    # La ligne est confiée au thread d'écriture : les E/S disque sortent du chemin
+    # critique des agents. La file est bornée : si le disque ne suit pas, l'appelant
+    # attend au lieu de faire grossir la mémoire sans limite.
+    _get_writer().queue.put(line)
+
+
+class _LogWriter(threading.Thread):
+    """
+    Thread d'écriture du journal JSONL.
+
+    Consomme la file par lots (jusqu'à LOG_BATCH_SIZE lignes JSON déjà sérialisées) et
+    les ajoute au fichier en une seule écriture. Les demandes de vidage (flush_logs) passent
+    par la même file, ce qui garantit que toutes les entrées soumises avant elles sont écrites.
+    """
+
+    def __init__(self):
+        super().__init__(name="experiment-log-writer", daemon=True)
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._handle = None
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for item in batch:
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, _FlushRequest):
+                    try:
+                        self._write(lines)
+                        self._flush(item.fsync)
+                    finally:
+                        # Toujours libérer flush_logs, même si l'écriture a échoué
+                        lines = []
+                        item.done.set()
+                else:
+                    lines.append(item)
+            self._write(lines)
+
+        self._flush(fsync=True)
+        if self._handle is not None:
+            self._handle.close()
+
+    @stage("log_write")
+    def _write(self, lines: list):
+        if not lines:
+            return
         try:
-            with open(LOG_FILE, 'r', encoding='utf-8') as f:
+            if self._handle is None:
+                os.makedirs(os.path.dirname(JSONL_LOG_FILE), exist_ok=True)
+                self._handle = open(
+                    JSONL_LOG_FILE, "a", encoding="utf-8", buffering=LOG_BUFFER_SIZE
+                )
+            self._handle.write("\n".join(lines) + "\n")
+        except Exception as e:
+            # Une erreur d'écriture ne doit jamais faire tomber le thread (ni, donc,
+            # bloquer les flush_logs suivants) ni les agents
+            print(f"⚠️ Attention : {len(lines)} entrées de log perdues ({e}).")
+
+    def _flush(self, fsync: bool):
+        if self._handle is None:
+            return
+        try:
+            self._handle.flush()
+            if fsync:
+                os.fsync(self._handle.fileno())
+        except Exception as e:
+            print(f"⚠️ Attention : impossible de vider le journal ({e}).")
+
+
+class _FlushRequest:
+    def __init__(self, fsync: bool):
+        self.fsync = fsync
+        self.done = threading.Event()
+
+
+def _get_writer() -> _LogWriter:
+    """Démarre (une seule fois) le thread d'écriture du journal."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = _LogWriter()
+            _writer.start()
+        return _writer
+
+
+def flush_logs(fsync: bool = True):
+    """
+    Attend que toutes les entrées soumises soient écrites dans le journal JSONL.
+
+    Args:
+        fsync (bool): Si True, force aussi l'écriture physique sur disque (os.fsync).
+            À appeler aux frontières de run (début/fin de mission, erreur fatale).
+    """
+    writer = _writer
+    if writer is None or not writer.is_alive():
+        return
+    request = _FlushRequest(fsync)
+    writer.queue.put(request)
+    # Un thread d'écriture mort ne répondra jamais : on cesse d'attendre
+    while not request.done.wait(LOG_FLUSH_POLL_SECONDS):
+        if not writer.is_alive():
+            print("⚠️ Attention : le thread d'écriture du journal s'est arrêté, vidage abandonné.")
+            return
+
+
+def shutdown_logging():
+    """
+    Vide la file d'attente, synchronise le fichier sur disque et arrête le thread d'écriture.
+
+    Appelée en fin de main() (succès, erreur ou sys.exit) et à la sortie du processus.
+    Un nouvel appel à log_experiment redémarre automatiquement le thread.
+    """
+    global _writer
+    with _writer_lock:
+        writer = _writer
+        _writer = None
+    if writer is None or not writer.is_alive():
+        return
+    writer.queue.put(_STOP)
+    writer.join()
+
+
+def read_experiment_log(jsonl_path: str = None, json_path: str = None) -> list:
+    """
+    Lit l'ensemble des entrées du journal, quel que soit leur format.
+
+    Fusionne l'ancien tableau JSON (LOG_FILE) et le journal JSONL, dans l'ordre
+    chronologique d'écriture, en éliminant les doublons grâce au champ 'id'.
+
+    Returns:
+        list: La liste des entrées, au même format que l'ancien tableau JSON.
+    """
+    jsonl_path = jsonl_path or JSONL_LOG_FILE
+    json_path = json_path or LOG_FILE
+    flush_logs(fsync=False)
+
+    entries = []
+    if os.path.exists(json_path):
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
                 content = f.read().strip()
-                if content: # Vérifie que le fichier n'est pas juste vide
-                    data = json.loads(content)
+                if content:
+                    entries.extend(json.loads(content))
         except json.JSONDecodeError:
-            # Si le fichier est corrompu, on repart à zéro (ou on pourrait sauvegarder un backup)
-            print(f"⚠️ Attention : Le fichier de logs {LOG_FILE} était corrompu. Une nouvelle liste a été créée.")
-            data = []
+            print(f"⚠️ Attention : Le fichier de logs {json_path} est corrompu, il est ignoré.")
 
-    data.append(entry)
-    
-    # Écriture
-    with open(LOG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+    if os.path.exists(jsonl_path):
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Typiquement une dernière ligne tronquée après un crash
+                    print(f"⚠️ Attention : ligne {line_number} illisible dans {jsonl_path}, ignorée.")
+
+    seen_ids = set()
+    unique_entries = []
+    for entry in entries:
+        entry_id = entry.get("id")
+        if entry_id is not None:
+            if entry_id in seen_ids:
+                continue
+            seen_ids.add(entry_id)
+        unique_entries.append(entry)
+    return unique_entries
+
+
+def export_json_log(output_path: str = None) -> int:
+    """
+    Convertit le journal en tableau JSON (format historique de LOG_FILE).
+
+    L'écriture passe par un fichier temporaire puis os.replace, pour ne jamais
+    laisser un tableau à moitié écrit.
+
+    Returns:
+        int: Le nombre d'entrées exportées.
+    """
+    output_path = output_path or LOG_FILE
+    entries = read_experiment_log(json_path=output_path)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+    return len(entries)
+
+
+atexit.register(shutdown_logging)
+
+
+if __name__ == "__main__":
+    # Conversion ponctuelle : python -m src.utils.logger
+    count = export_json_log()
+    print(f"✅ {count} entrées exportées vers {LOG_FILE}")
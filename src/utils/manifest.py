@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+MANIFEST_NAME = ".swarm_manifest.json"
+_MANIFEST_VERSION = 1
+
+
+def file_hash(path: str):
+    """SHA-256 of a file's bytes, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Per-file record of the last run over a work directory.
+
+    Stored as MANIFEST_NAME in that directory, keyed by path relative to it:
+    input and output content hashes, verdict, scores and iterations. A file
+    whose current content still matches the output of a PASS is up to date
+    and does not need another Auditor -> Fixer -> Judge loop.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, MANIFEST_NAME)
+        self.files = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory: str) -> "Manifest":
+        manifest = cls(directory)
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _MANIFEST_VERSION:
+                manifest.files = data.get("files", {})
+        except (OSError, ValueError, AttributeError):
+            # Missing or unreadable manifest: every file is processed again
+            pass
+        return manifest
+
+    def key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.directory).replace(os.sep, "/")
+
+    def is_up_to_date(self, path: str) -> bool:
+        """True if path still holds the output of a run that passed."""
+        entry = self.files.get(self.key(path))
+        return (
+            entry is not None
+            and entry.get("verdict") == "PASS"
+            and entry.get("output_hash") == file_hash(path)
+        )
+
+    def is_unchanged_input(self, key: str, source_path: str, output_path: str) -> bool:
+        """True if source_path is the input a passing output_path was fixed from."""
+        entry = self.files.get(key)
+        return (
+            entry is not None
+            and entry.get("verdict") == "PASS"
+            and entry.get("input_hash") == file_hash(source_path)
+            and entry.get("output_hash") == file_hash(output_path)
+        )
+
+    def record(
+        self,
+        path: str,
+        input_hash: str,
+        verdict: str,
+        original_score: float,
+        final_score: float,
+        iterations: int,
+    ) -> None:
+        entry = {
+            "input_hash": input_hash,
+            "output_hash": file_hash(path),
+            "verdict": verdict,
+            "original_score": original_score,
+            "final_score": final_score,
+            "iterations": iterations,
+            "updated": time.time(),
+        }
+        with self._lock:
+            self.files[self.key(path)] = entry
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(
+                {"version": _MANIFEST_VERSION, "files": self.files},
+                indent=2,
+                sort_keys=True,
+            )
+        # Write-then-rename, so an interrupted save never leaves a truncated manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
@@ -1,12 +1,46 @@
+import hashlib
 import json
-import time
 import os
+import random
+import re
+import threading
+import time
 import warnings
+from src.utils.disk_cache import DiskCache
+from src.utils.rate_limiter import get_rate_limiter, retry_delay
+from src.utils.tokens import estimate_tokens
+from src.utils.tracing import current_tags, stage
+from src.utils.usage import get_usage_tracker
 
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
 MOCK_MODE = os.getenv("MOCK_MODE", "false").lower() == "true"
 
+# Simulated API behaviour for mock runs and benchmarks; the defaults answer instantly
+MOCK_LATENCY = float(os.getenv("MOCK_LATENCY", "0"))
+MOCK_JITTER = float(os.getenv("MOCK_JITTER", "0"))
+MOCK_429_RATE = float(os.getenv("MOCK_429_RATE", "0"))
+MOCK_RETRY_AFTER = float(os.getenv("MOCK_RETRY_AFTER", "0.1"))
+MOCK_RESPONSE_BYTES = int(os.getenv("MOCK_RESPONSE_BYTES", "0"))
+MOCK_SEED = os.getenv("MOCK_SEED")
+
+# Opt-in cache of model responses, keyed by model name + normalized prompt
+LLM_CACHE = os.getenv("LLM_CACHE", "false").lower() == "true"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(".cache", "llm"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "200"))
+
+# Usage of the calling thread's last model call, for its log entry
+_last_usage = threading.local()
+
+_llm_cache = DiskCache(
+    LLM_CACHE_DIR,
+    max_entries=100000,
+    max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=LLM_CACHE_TTL,
+    compress=True,
+)
+
 
 def get_model(api_key: str):
     if MOCK_MODE:
@@ -20,24 +54,111 @@ def get_model(api_key: str):
     return genai.GenerativeModel("gemini-3-flash-preview")
 
 
-class MockModel:
-    def generate_content(self, content):
-        class MockResponse:
-            text = '{"verdict": "PASS", "feedback": "Mock mode - code looks good"}'
+class MockUsageMetadata:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
 
-        return MockResponse()
 
+class MockResponse:
+    def __init__(self, text: str, prompt_tokens: int = 0):
+        self.text = text
+        # Estimated like the real API reports them, so accounting works in mock runs
+        self.usage_metadata = MockUsageMetadata(prompt_tokens, estimate_tokens(text))
 
-def call_with_retry(model, prompt: str, max_retries: int = 5) -> str:
-    if MOCK_MODE:
-        return model.generate_content([]).text
 
-    # Start with a 20-second wait to be safe
-    base_wait = 20
+class MockModel:
+    """
+    Stand-in for the Gemini model.
+
+    Each call sleeps for latency +/- jitter seconds, fails with a 429 at
+    rate_limit_rate (carrying a retry hint of retry_after seconds, like the
+    real API), and pads its answer to about response_bytes. Defaults come
+    from the MOCK_* environment variables.
+    """
+
+    model_name = "mock"
+
+    def __init__(
+        self,
+        latency: float = None,
+        jitter: float = None,
+        rate_limit_rate: float = None,
+        retry_after: float = None,
+        response_bytes: int = None,
+        seed=None,
+    ):
+        self.latency = MOCK_LATENCY if latency is None else latency
+        self.jitter = MOCK_JITTER if jitter is None else jitter
+        self.rate_limit_rate = MOCK_429_RATE if rate_limit_rate is None else rate_limit_rate
+        self.retry_after = MOCK_RETRY_AFTER if retry_after is None else retry_after
+        self.response_bytes = MOCK_RESPONSE_BYTES if response_bytes is None else response_bytes
+        self._random = random.Random(MOCK_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, content):
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            rate_limited = self._random.random() < self.rate_limit_rate
+        if delay > 0:
+            time.sleep(delay)
+        if rate_limited:
+            raise Exception(
+                f"429 Resource has been exhausted (mock). Please retry in {self.retry_after}s."
+            )
+
+        answer = {"verdict": "PASS", "feedback": "Mock mode - code looks good"}
+        text = json.dumps(answer)
+        if self.response_bytes > len(text):
+            answer["padding"] = "x" * (self.response_bytes - len(text) - len(', "padding": ""'))
+            text = json.dumps(answer)
+        return MockResponse(text, estimate_tokens(json.dumps(content, default=str)))
+
+
+def call_with_retry(model, prompt: str, max_retries: int = 5, agent: str = None) -> str:
+    """
+    Send prompt to model and return the response text.
+
+    Token usage is recorded for agent and for the file and iteration in the
+    current trace context; get_last_usage() returns it for the log entry.
+    Raises BudgetExceededError instead of calling once the run's budget is spent.
+    """
+    _last_usage.value = None
+    usage = get_usage_tracker()
+    tags = current_tags()
+    files = tags.get("files") or ([tags["file"]] if tags.get("file") else [])
+
+    # Mock models go through the same cache, limiter and retry path as the real one
+    cache_key = _llm_cache_key(model, prompt) if LLM_CACHE else None
+    if cache_key:
+        cached = _llm_cache.get(cache_key)
+        if cached is not None:
+            usage.record(0, 0, agent, files, tags.get("iteration"), cached=True)
+            _last_usage.value = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0, "cached": True}
+            return cached
+
+    # Every agent shares one limiter, so the process as a whole stays under quota
+    limiter = get_rate_limiter()
+    prompt_tokens = estimate_tokens(prompt)
 
     for attempt in range(max_retries):
+        usage.check_budget(prompt_tokens)
+        with stage("llm_wait"):
+            limiter.acquire(prompt_tokens)
         try:
-            response = model.generate_content([{"role": "user", "parts": [prompt]}])
+            with stage("llm"):
+                response = model.generate_content([{"role": "user", "parts": [prompt]}])
+            input_tokens, output_tokens, estimated = _response_tokens(response, prompt_tokens)
+            cost = usage.record(input_tokens, output_tokens, agent, files, tags.get("iteration"))
+            _last_usage.value = {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost": round(cost, 6),
+                "estimated": estimated,
+            }
+            if cache_key:
+                _llm_cache.put(cache_key, response.text)
             return response.text
 
         except Exception as e:
@@ -49,16 +170,49 @@ def call_with_retry(model, prompt: str, max_retries: int = 5) -> str:
                 or "quota" in error_str.lower()
                 or "resource" in error_str.lower()
             ):
-                wait_time = base_wait * (
-                    2**attempt
-                )  # Exponential backoff: 20s, 40s, 80s...
+                wait_time = retry_delay(e, attempt)
                 print(
-                    f"   ⏳ Rate limit hit. Cooling down for {wait_time}s (Attempt {attempt+1}/{max_retries})..."
+                    f"   ⏳ Rate limit hit. Cooling down for {wait_time:.1f}s (Attempt {attempt+1}/{max_retries})..."
                 )
-                time.sleep(wait_time)
+                limiter.pause(wait_time)
             else:
                 # If the model is 404 again (unlikely now), print it clearly
                 print(f"❌ API Error: {error_str}")
                 raise e
 
     raise Exception("❌ Max retries exceeded. API is too busy.")
+
+
+def get_last_usage() -> dict:
+    """Tokens and cost of this thread's last call_with_retry, or None."""
+    return getattr(_last_usage, "value", None)
+
+
+def _response_tokens(response, prompt_tokens: int) -> tuple:
+    """(input, output, estimated) from the response's usage_metadata, estimated if missing."""
+    metadata = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(metadata, "prompt_token_count", None)
+    output_tokens = getattr(metadata, "candidates_token_count", None)
+    if input_tokens is None or output_tokens is None:
+        return prompt_tokens, estimate_tokens(getattr(response, "text", "")), True
+    # Thinking tokens are billed as output
+    output_tokens += getattr(metadata, "thoughts_token_count", None) or 0
+    return input_tokens, output_tokens, False
+
+
+def _llm_cache_key(model, prompt: str) -> str:
+    # Trailing whitespace and blank-line runs do not change the answer
+    normalized = re.sub(r"[ \t]+$", "", prompt.strip(), flags=re.MULTILINE)
+    normalized = re.sub(r"\n{3,}", "\n\n", normalized)
+    model_name = getattr(model, "model_name", type(model).__name__)
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalized.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_llm_cache_stats() -> dict:
+    stats = _llm_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
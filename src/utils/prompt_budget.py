@@ -0,0 +1,118 @@
+import json
+import os
+import re
+from src.utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Upper bound for a whole prompt, in estimated tokens
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "12000"))
+
+# Analysis keys that repeat content the prompt already carries in full, or
+# only serve bookkeeping
+_REDUNDANT_ANALYSIS_KEYS = ("original_code", "current_iteration", "input_hash")
+
+# Keys of a previous fix result that are worth repeating; its fixed_code is
+# the file on disk, which the Fixer's retry prompt sends as CURRENT CODE
+_PREVIOUS_FIX_KEYS = ("changes_made", "output_mode", "error")
+
+_PASSING_TEST_LINE = re.compile(r"::\S+ PASSED\b")
+
+
+class PromptBudget:
+    """
+    Token budget for one prompt.
+
+    Text that must be sent whole (system prompt, code) is reserved first; the
+    remaining budget goes to optional sections in priority order, so the
+    lowest-value sections are the first to be trimmed or dropped.
+    """
+
+    def __init__(self, max_tokens: int = PROMPT_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self._reserved = 0
+        self._sections = []
+
+    def reserve(self, *texts: str) -> None:
+        for text in texts:
+            self._reserved += estimate_tokens(text)
+
+    def section(
+        self,
+        name: str,
+        text: str,
+        priority: int = 0,
+        cap: int = None,
+        keep: str = "head",
+    ) -> None:
+        """
+        Register an optional section.
+
+        keep: which part survives trimming, "head", "tail" or "both"
+        (start and end, e.g. a log whose summary is at the bottom).
+        """
+        self._sections.append(
+            {"name": name, "text": text or "", "priority": priority, "cap": cap, "keep": keep}
+        )
+
+    def allocate(self) -> dict:
+        """Return {section name: text trimmed to its share of the budget}."""
+        available = max(0, self.max_tokens - self._reserved)
+        allocated = {}
+        for section in sorted(self._sections, key=lambda s: -s["priority"]):
+            limit = available if section["cap"] is None else min(section["cap"], available)
+            text = trim_to_tokens(section["text"], limit, section["keep"])
+            allocated[section["name"]] = text
+            available -= estimate_tokens(text)
+        return allocated
+
+
+def trim_to_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """Cut text to about max_tokens on line boundaries, marking what was removed."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return "[... omitted to fit the prompt budget ...]"
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if keep == "both":
+        head = _cut_head(text, max_chars // 2)
+        tail = _cut_tail(text, max_chars // 2)
+        removed = len(text) - len(head) - len(tail)
+        return f"{head}\n[... {removed} characters truncated ...]\n{tail}"
+    if keep == "tail":
+        tail = _cut_tail(text, max_chars)
+        return f"[... {len(text) - len(tail)} characters truncated ...]\n{tail}"
+
+    head = _cut_head(text, max_chars)
+    return f"{head}\n[... {len(text) - len(head)} characters truncated ...]"
+
+
+def _cut_head(text: str, max_chars: int) -> str:
+    head = text[:max_chars]
+    return head[: head.rfind("\n")] if "\n" in head else head
+
+
+def _cut_tail(text: str, max_chars: int) -> str:
+    tail = text[-max_chars:]
+    return tail[tail.find("\n") + 1 :] if "\n" in tail else tail
+
+
+def drop_passing_test_lines(pytest_output: str) -> str:
+    """Remove `test_x.py::test_y PASSED` lines from verbose pytest output."""
+    if not pytest_output:
+        return ""
+    return "\n".join(
+        line for line in pytest_output.splitlines() if not _PASSING_TEST_LINE.search(line)
+    )
+
+
+def compact_analysis(analysis: dict) -> str:
+    """Serialize an analysis for a prompt, without the code the prompt already contains."""
+    compact = {
+        key: value for key, value in analysis.items() if key not in _REDUNDANT_ANALYSIS_KEYS
+    }
+    previous_fix = compact.get("previous_fix")
+    if isinstance(previous_fix, dict):
+        compact["previous_fix"] = {
+            key: previous_fix[key] for key in _PREVIOUS_FIX_KEYS if key in previous_fix
+        }
+    return json.dumps(compact, indent=2, default=str)
@@ -0,0 +1,118 @@
+import os
+import random
+import re
+import threading
+import time
+
+# Quota shared by every agent in the process; 0 disables the corresponding limit
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+
+# Jittered exponential backoff when the server gives no retry hint. Waits fall
+# in [backoff / 2, backoff]: with the defaults the four waits between five
+# attempts add up to 300-600s, never less than the fixed 20/40/80/160s schedule
+# this replaces, so sustained quota limiting is survived as before
+BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE", "40"))
+BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX", "640"))
+
+_RETRY_HINT_PATTERNS = (
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+    re.compile(r"retry in\s*([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry-after:?\s*([\d.]+)", re.IGNORECASE),
+)
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests/minute and tokens/minute.
+
+    Both buckets start full and refill continuously, so callers run at the
+    quota ceiling instead of bursting and then stalling. A 429 pauses every
+    caller until the server's retry time has passed.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._paused_until = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request of `tokens` tokens fits the quota. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = self._reserve(tokens)
+                    if wait <= 0:
+                        return waited
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds`, e.g. after a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._requests = min(
+                float(self.requests_per_minute),
+                self._requests + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self._tokens = min(
+                float(self.tokens_per_minute),
+                self._tokens + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def _reserve(self, tokens: int) -> float:
+        """Take from both buckets, or return how long until both can cover the request."""
+        wait = 0.0
+        if self.requests_per_minute and self._requests < 1:
+            wait = (1 - self._requests) * 60.0 / self.requests_per_minute
+        if self.tokens_per_minute:
+            # A prompt larger than the whole bucket goes through once the bucket is full
+            needed = min(tokens, self.tokens_per_minute)
+            if self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60.0 / self.tokens_per_minute)
+        if wait > 0:
+            return wait
+
+        if self.requests_per_minute:
+            self._requests -= 1
+        if self.tokens_per_minute:
+            self._tokens -= min(tokens, self.tokens_per_minute)
+        return 0.0
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait after a rate-limit error: the server's hint if any, else jittered backoff."""
+    error_str = str(error)
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(error_str)
+        if match:
+            return float(match.group(1)) + random.uniform(0, 1)
+
+    backoff = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2**attempt))
+    return random.uniform(backoff / 2, backoff)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(LLM_RPM, LLM_TPM)
+        return _rate_limiter
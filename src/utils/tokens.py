@@ -0,0 +1,9 @@
+# Gemini averages roughly four characters of English/code per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for rate limiting and prompt budgets."""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
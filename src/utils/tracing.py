@@ -0,0 +1,141 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bound on kept spans; later spans still count towards the stage totals
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500000"))
+
+_stage_totals = {}
+_stage_lock = threading.Lock()
+
+# Spans are only kept once tracing is enabled: (name, start, seconds, thread id, tags)
+_spans = None
+_dropped_spans = 0
+_origin = time.perf_counter()
+_thread_names = {}
+
+# Tags (file, iteration, ...) inherited by every span opened inside trace_context()
+_span_tags = contextvars.ContextVar("span_tags", default={})
+
+
+def enable_tracing() -> None:
+    """Start keeping individual spans for export_chrome_trace()."""
+    global _spans, _dropped_spans, _origin
+    with _stage_lock:
+        _spans = []
+        _dropped_spans = 0
+        _origin = time.perf_counter()
+        _thread_names.clear()
+
+
+@contextmanager
+def trace_context(**tags):
+    """Tag every span opened in this block, on this thread, with tags."""
+    token = _span_tags.set({**_span_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _span_tags.reset(token)
+
+
+def current_tags() -> dict:
+    """Tags set by the enclosing trace_context() blocks."""
+    return dict(_span_tags.get())
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time the enclosed block and add it to the `name` stage.
+
+    Totals are wall time summed over every thread, so with several workers a
+    stage can add up to more than the run took. Stages nest: the pylint run
+    inside an audit counts towards both "audit" and "pylint". The block
+    receives the span's tags as a dict it may add to. Work handed to another
+    thread keeps its tags only if submitted through contextvars.copy_context().
+    """
+    tags = dict(_span_tags.get())
+    start = time.perf_counter()
+    try:
+        yield tags
+    finally:
+        elapsed = time.perf_counter() - start
+        _record(name, start, elapsed, tags)
+
+
+def _record(name: str, start: float, elapsed: float, tags: dict) -> None:
+    global _dropped_spans
+    with _stage_lock:
+        total = _stage_totals.setdefault(name, {"calls": 0, "seconds": 0.0})
+        total["calls"] += 1
+        total["seconds"] += elapsed
+        if _spans is None:
+            return
+        if len(_spans) >= TRACE_MAX_SPANS:
+            _dropped_spans += 1
+            return
+        thread_id = threading.get_ident()
+        if thread_id not in _thread_names:
+            _thread_names[thread_id] = threading.current_thread().name
+        _spans.append((name, start, elapsed, thread_id, tags))
+
+
+def get_stage_totals() -> dict:
+    """{stage: {"calls", "seconds"}} accumulated since the last reset."""
+    with _stage_lock:
+        return {name: dict(total) for name, total in _stage_totals.items()}
+
+
+def reset_stage_totals() -> None:
+    with _stage_lock:
+        _stage_totals.clear()
+
+
+def export_chrome_trace(path: str) -> int:
+    """
+    Write the kept spans in the Chrome trace event format.
+
+    The file opens in chrome://tracing and in Perfetto (ui.perfetto.dev):
+    one track per thread, span tags under "args". Returns the span count.
+    """
+    with _stage_lock:
+        spans = list(_spans or [])
+        thread_names = dict(_thread_names)
+        dropped = _dropped_spans
+        origin = _origin
+
+    pid = os.getpid()
+    events = [
+        {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "refactoring-swarm"}}
+    ]
+    for thread_id, thread_name in thread_names.items():
+        events.append(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+        )
+    for name, start, elapsed, thread_id, tags in spans:
+        events.append(
+            {
+                "name": name,
+                "cat": "swarm",
+                "ph": "X",
+                "ts": round((start - origin) * 1e6, 3),
+                "dur": round(elapsed * 1e6, 3),
+                "pid": pid,
+                "tid": thread_id,
+                "args": tags,
+            }
+        )
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"dropped_spans": dropped}},
+            f,
+            default=str,
+        )
+    os.replace(tmp_path, path)
+    return len(spans)
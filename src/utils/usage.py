@@ -0,0 +1,151 @@
+import os
+import threading
+
+# USD per million tokens, used for cost estimates; 0 leaves costs at 0
+LLM_INPUT_PRICE = float(os.getenv("LLM_INPUT_PRICE", "0"))
+LLM_OUTPUT_PRICE = float(os.getenv("LLM_OUTPUT_PRICE", "0"))
+
+# Per-run spending limits; 0 disables the corresponding limit
+LLM_TOKEN_BUDGET = int(os.getenv("LLM_TOKEN_BUDGET", "0"))
+LLM_COST_BUDGET = float(os.getenv("LLM_COST_BUDGET", "0"))
+
+
+class BudgetExceededError(Exception):
+    """Raised instead of a model call once the run's token or cost budget is spent."""
+
+
+def _empty_totals() -> dict:
+    return {"calls": 0, "cached_calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+
+
+class UsageTracker:
+    """
+    Token and cost accounting for every model call of a run.
+
+    Each call is added to the run totals and to the totals of its agent, of
+    the files it was about (a batched call is split evenly between them) and
+    of its fix/judge iteration. Once the token or cost budget is spent, the
+    tracker refuses further calls with BudgetExceededError; the refusal is
+    sticky, so every agent stops rather than only the one that hit the limit.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 0,
+        cost_budget: float = 0.0,
+        input_price: float = 0.0,
+        output_price: float = 0.0,
+    ):
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.input_price = input_price
+        self.output_price = output_price
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.totals = _empty_totals()
+            self.by_agent = {}
+            self.by_file = {}
+            self.by_iteration = {}
+            self._exhausted = False
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_price + output_tokens * self.output_price) / 1_000_000
+
+    def check_budget(self, prompt_tokens: int = 0) -> None:
+        """Raise BudgetExceededError if a call with prompt_tokens input tokens would overspend."""
+        with self._lock:
+            if not self._exhausted:
+                tokens = self.totals["input_tokens"] + self.totals["output_tokens"] + prompt_tokens
+                cost = self.totals["cost"] + self.cost(prompt_tokens, 0)
+                self._exhausted = (self.token_budget and tokens > self.token_budget) or (
+                    self.cost_budget and cost > self.cost_budget
+                )
+            if self._exhausted:
+                raise BudgetExceededError(
+                    f"LLM budget exhausted after {self.totals['input_tokens'] + self.totals['output_tokens']} "
+                    f"tokens (${self.totals['cost']:.4f})"
+                )
+
+    def exhausted(self) -> bool:
+        with self._lock:
+            return bool(self._exhausted)
+
+    def record(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        agent: str = None,
+        files: list = None,
+        iteration: int = None,
+        cached: bool = False,
+    ) -> float:
+        """Add one call; returns its cost. Cached answers count as calls without tokens."""
+        cost = 0.0 if cached else self.cost(input_tokens, output_tokens)
+        if cached:
+            input_tokens = output_tokens = 0
+        with self._lock:
+            buckets = [self.totals, self.by_agent.setdefault(agent or "unknown", _empty_totals())]
+            if iteration is not None:
+                buckets.append(self.by_iteration.setdefault(iteration, _empty_totals()))
+            for bucket in buckets:
+                _add(bucket, input_tokens, output_tokens, cost, cached)
+            for file_path in files or []:
+                _add(
+                    self.by_file.setdefault(file_path, _empty_totals()),
+                    input_tokens / len(files),
+                    output_tokens / len(files),
+                    cost / len(files),
+                    cached,
+                )
+        return cost
+
+    def file_usage(self, file_path: str) -> dict:
+        with self._lock:
+            return _rounded(self.by_file.get(file_path, _empty_totals()))
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "totals": _rounded(self.totals),
+                "by_agent": {name: _rounded(bucket) for name, bucket in self.by_agent.items()},
+                "by_file": {name: _rounded(bucket) for name, bucket in self.by_file.items()},
+                "by_iteration": {
+                    iteration: _rounded(bucket)
+                    for iteration, bucket in sorted(self.by_iteration.items())
+                },
+                "budget_exhausted": bool(self._exhausted),
+            }
+
+
+def _add(bucket: dict, input_tokens, output_tokens, cost: float, cached: bool) -> None:
+    bucket["calls"] += 1
+    bucket["cached_calls"] += 1 if cached else 0
+    bucket["input_tokens"] += input_tokens
+    bucket["output_tokens"] += output_tokens
+    bucket["cost"] += cost
+
+
+def _rounded(bucket: dict) -> dict:
+    return {
+        **bucket,
+        "input_tokens": round(bucket["input_tokens"]),
+        "output_tokens": round(bucket["output_tokens"]),
+        "cost": round(bucket["cost"], 6),
+    }
+
+
+_usage_tracker = None
+_usage_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    global _usage_tracker
+    with _usage_tracker_lock:
+        if _usage_tracker is None:
+            _usage_tracker = UsageTracker(
+                LLM_TOKEN_BUDGET, LLM_COST_BUDGET, LLM_INPUT_PRICE, LLM_OUTPUT_PRICE
+            )
+        return _usage_tracker
@@ -0,0 +1,49 @@
+from src.tools.ast_fixer import apply_ast_rules, rule_open_context_manager
+
+
+def _wrap(code: str) -> str:
+    return apply_ast_rules(code, [rule_open_context_manager])[0]
+
+
+def test_open_is_wrapped_when_the_handle_stays_local():
+    code = """def read(path):
+    file = open(path, 'r')
+    data = file.read()
+    file.close()
+    return data.strip()
+"""
+    assert _wrap(code) == """def read(path):
+    with open(path, 'r') as file:
+        data = file.read()
+    return data.strip()
+"""
+
+
+def test_handle_captured_by_nested_function_is_left_alone():
+    code = """def setup(path):
+    f = open(path, "w")
+    def log(msg):
+        f.write(msg)
+    log("start")
+    return log
+"""
+    assert _wrap(code) == code
+
+
+def test_handle_passed_to_a_call_is_left_alone():
+    code = """def wrap(path):
+    fh = open(path)
+    obj = Wrapper(fh)
+    obj.start()
+    return obj
+"""
+    assert _wrap(code) == code
+
+
+def test_handle_stored_in_a_container_is_left_alone():
+    code = """def collect(path):
+    f = open(path)
+    handles = [f]
+    return handles
+"""
+    assert _wrap(code) == code